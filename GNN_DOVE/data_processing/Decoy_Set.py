@@ -0,0 +1,211 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from scipy.spatial import cKDTree
+from data_processing.PDB_Reader import Structure_Lines,Structure_Name
+from data_processing.Extract_Interface import Interface_Residues,Write_Interface
+from data_processing.Residue_Template import Template_Graph,Subset_Graph
+from data_processing.Prepare_Input import Graph_Sample,Interface_Stats,Filter_Stage
+from ops.Stage_Profiler import Profile_Stage
+
+#graphs of the receptors and ligands seen by this process, by atom signature, most recent last
+REFERENCES = OrderedDict()
+MAX_REFERENCES = 4
+
+def Split_Chains(structure):
+    """
+    ATOM lines of the receptor and the ligand, same split as Get_Interface: the ligand starts at the first chain B atom
+    :param structure: pdb path or PDB_Model
+    :return:
+    receptor lines, ligand lines, sha1 of the atom names, residues and chains of both
+    """
+    receptor_lines = []
+    ligand_lines = []
+    digest = hashlib.sha1()
+    goon = False
+    with Structure_Lines(structure) as file:
+        for line in file:
+            if line[:4] != 'ATOM' or line[4:5] != ' ':
+                continue
+            if line[21] == "B":
+                goon = True
+            if goon:
+                ligand_lines.append(line)
+            else:
+                receptor_lines.append(line)
+            digest.update(line[12:27].encode())
+    digest.update(str(len(receptor_lines)).encode())
+    return receptor_lines, ligand_lines, digest.hexdigest()
+
+def Residue_Groups(receptor_lines, ligand_lines):
+    """
+    residue groups of Get_Interface, runs of atoms with the same residue type.
+    Get_Interface never closes the last run, so its atoms are left out of the interface search.
+    :return:
+    group id of each receptor atom and of each ligand atom, -1 for the atoms of the last run
+    """
+    groups = []
+    pre_type = None
+    for k, line in enumerate(receptor_lines + ligand_lines):
+        if k == 0 or line[17:20] != pre_type or k == len(receptor_lines):
+            groups.append(k)
+        pre_type = line[17:20]
+    start = np.zeros(len(receptor_lines) + len(ligand_lines), dtype=np.int64)
+    start[groups] = 1
+    group = np.cumsum(start) - 1
+    group[group == group[-1]] = -1
+    rgroup = group[:len(receptor_lines)]
+    lgroup = group[len(receptor_lines):]
+    # ligand ids restart from 0, like llist in Get_Interface
+    lgroup = np.where(lgroup >= 0, lgroup - (lgroup[lgroup >= 0].min() if (lgroup >= 0).any() else 0), -1)
+    return rgroup, lgroup
+
+def Line_Coordinates(line_list):
+    return np.array([[float(line[30:38]), float(line[38:46]), float(line[46:54])] for line in line_list]).reshape(-1, 3)
+
+def Decoy_Reference(signature, receptor_lines, ligand_lines):
+    """
+    receptor and ligand graphs shared by the decoys with the same atoms, built from the first one
+    :return:
+    dict of the template graphs, residue groups and receptor coordinates, None if a chain is not covered by the templates
+    """
+    if signature in REFERENCES:
+        REFERENCES.move_to_end(signature)
+        return REFERENCES[signature]
+    reference = None
+    if len(receptor_lines) > 0 and len(ligand_lines) > 0:
+        receptor_graph = Template_Graph(receptor_lines)
+        ligand_graph = Template_Graph(ligand_lines)
+        if receptor_graph is not None and ligand_graph is not None:
+            rgroup, lgroup = Residue_Groups(receptor_lines, ligand_lines)
+            rsearch = np.nonzero(rgroup >= 0)[0]
+            rcoords = receptor_graph['coords']
+            reference = {'receptor_graph': receptor_graph, 'ligand_graph': ligand_graph,
+                         'rgroup': rgroup, 'lgroup': lgroup, 'rsearch': rsearch, 'lsearch': np.nonzero(lgroup >= 0)[0],
+                         'receptor_lines': receptor_lines, 'rcoords': rcoords, 'rtree': cKDTree(rcoords[rsearch])}
+    REFERENCES[signature] = reference
+    if len(REFERENCES) > MAX_REFERENCES:
+        REFERENCES.popitem(last=False)
+    return reference
+
+def Decoy_Set_Sample(structure_path, sparse=False, save_input=False, prefilter=None):
+    """
+    same as Form_Sample for rigid-body decoys of one docking run: the receptor and ligand graphs are built once,
+    each decoy only selects its interface atoms and computes the receptor-ligand distances
+    :param structure_path: docking model path, or PDB_Model of a multi-model pdb or MEGADOCK pose
+    :param sparse: edge lists instead of dense adjacency matrices
+    :param save_input: also write Input.rinterface and Input.linterface beside structure_path
+    :param prefilter: thresholds from Prefilter_Thresholds, decoys failing them are not featurized
+    :return:
+    sample of Form_Sample, None if the chains are not covered by the residue templates
+    """
+    name = Structure_Name(structure_path)
+    with Profile_Stage("interface", name):
+        receptor_lines, ligand_lines, signature = Split_Chains(structure_path)
+        reference = Decoy_Reference(signature, receptor_lines, ligand_lines)
+        if reference is None:
+            return None
+        if receptor_lines == reference['receptor_lines']:
+            #rigid receptor, reuse its coordinates and kd-tree
+            rcoords, rtree = reference['rcoords'], reference['rtree']
+        else:
+            rcoords = Line_Coordinates(receptor_lines)
+            rtree = None
+        lcoords = Line_Coordinates(ligand_lines)
+        rsearch, lsearch = reference['rsearch'], reference['lsearch']
+        r_index, l_index, contacts, clashes = Interface_Residues(rcoords[rsearch], reference['rgroup'][rsearch],
+                                                                 lcoords[lsearch], reference['lgroup'][lsearch], 10, rtree)
+    stats = Interface_Stats({'residues': len(r_index) + len(l_index), 'contacts': contacts, 'clashes': clashes})
+    if Filter_Stage(stats, prefilter) >= 0:
+        return {'stats': stats}
+    receptor_index = np.nonzero(np.isin(reference['rgroup'], r_index))[0]
+    ligand_index = np.nonzero(np.isin(reference['lgroup'], l_index))[0]
+    if len(receptor_index) == 0 or len(ligand_index) == 0:
+        # no interface, dropped as in Form_Sample instead of scoring an empty graph
+        print("No receptor-ligand interface within 10A in %s" % name)
+        return {'stats': stats}
+    if save_input:
+        Write_Interface([receptor_lines[k] for k in receptor_index], structure_path, ".rinterface")
+        Write_Interface([ligand_lines[k] for k in ligand_index], structure_path, ".linterface")
+    with Profile_Stage("featurize", name):
+        receptor_graph = Subset_Graph(reference['receptor_graph'], receptor_index)
+        receptor_graph['coords'] = rcoords[receptor_index]
+        ligand_graph = Subset_Graph(reference['ligand_graph'], ligand_index)
+        ligand_graph['coords'] = lcoords[ligand_index]
+        sample = Graph_Sample(receptor_graph, ligand_graph, sparse)
+    sample['stats'] = stats
+    return sample
+
+def Decoy_Trace(structure_path):
+    """
+    :param structure_path: docking model path or PDB_Model
+    :return:
+    signature of the receptor and ligand atoms, CA coordinates of both chains (all atoms if there is no CA)
+    """
+    receptor_lines, ligand_lines, signature = Split_Chains(structure_path)
+    lines = [line for line in receptor_lines + ligand_lines if line[12:16] == " CA "]
+    return signature, Line_Coordinates(lines if lines else receptor_lines + ligand_lines)
+
+def Dedup_Decoys(Study_Name, structure_list, grid):
+    """
+    group decoys of the same atoms whose CA atoms all lie within grid of a decoy seen before.
+    Decoys are hashed by the grid cell of their CA centroid, and only compared with the decoys of the neighboring cells.
+    :param Study_Name: decoy names
+    :param structure_list: iterable of docking model paths or PDB_Model, same order as Study_Name
+    :param grid: largest CA distance between duplicates (angstrom)
+    :return:
+    dict of decoy name to the name of the first decoy of its group, which is scored for the whole group
+    """
+    representative = {}
+    cells = {}
+    neighbors = np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1])).reshape(3, -1).T
+    for name, structure_path in zip(Study_Name, structure_list):
+        with Profile_Stage("dedup", name):
+            signature, coords = Decoy_Trace(structure_path)
+            cell = np.floor(coords.mean(0) / grid).astype(np.int64) if len(coords) > 0 else np.zeros(3, dtype=np.int64)
+            representative[name] = name
+            # centroids of duplicates are within grid, so they are in the same or a neighboring cell
+            for offset in neighbors:
+                for other, other_coords in cells.get((signature,) + tuple(cell + offset), []):
+                    if np.linalg.norm(coords - other_coords, axis=1).max(initial=0) <= grid:
+                        representative[name] = other
+                        break
+                if representative[name] != name:
+                    break
+            if representative[name] == name:
+                cells.setdefault((signature,) + tuple(cell), []).append((name, coords))
+    return representative
@@ -33,8 +33,13 @@
 # along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
 
 import os
+import numpy as np
+from scipy.spatial import cKDTree
 from ops.Timer_Control import set_timeout,after_timeout
+from data_processing.PDB_Reader import Structure_Lines
 RESIDUE_Forbidden_SET={"FAD"}
+CONTACT_CUT_OFF=5#receptor-ligand atom pairs closer than this are contacts
+CLASH_CUT_OFF=3#receptor-ligand atom pairs closer than this are clashes
 
 def Extract_Interface(pdb_path):
     """
@@ -44,16 +49,30 @@ def Extract_Interface(pdb_path):
     :return:
     extract a receptor and ligand, meanwhile, write two files of the receptor interface part, ligand interface part
     """
+    final_receptor, final_ligand=Get_Interface(pdb_path)
+    #write that into our path
+    rpath=Write_Interface(final_receptor,pdb_path,".rinterface")
+    lpath=Write_Interface(final_ligand, pdb_path, ".linterface")
+    return rpath,lpath
+
+def Get_Interface(pdb_path,stats=None):
+    """
+    same as Extract_Interface, but keeps the interface in memory
+    :param pdb_path:docking model path, or PDB_Model of a multi-model pdb
+    :param stats: dict filled with the interface residue, atom contact and clash counts, None to skip
+    :return:
+    pdb lines of the receptor interface part and the ligand interface part
+    """
     receptor_list=[]
     ligand_list=[]
     rlist=[]
     llist=[]
     count_r=0
     count_l=0
-    with open(pdb_path,'r') as file:
-        line = file.readline()               # call readline()
+    with Structure_Lines(pdb_path) as file:
+        line = next(file,'')
         while line[0:4]!='ATOM':
-            line=file.readline()
+            line=next(file,'')
         atomid = 0
         count = 1
         goon = False
@@ -68,7 +87,7 @@ def Extract_Interface(pdb_path):
 
             dat_in = line[0:80].split()
             if len(dat_in) == 0:
-                line = file.readline()
+                line = next(file,'')
                 continue
 
             if (dat_in[0] == 'ATOM'):
@@ -116,41 +135,68 @@ def Extract_Interface(pdb_path):
                 pre_residue_type = residue_type
                 pre_residue_id = residue_id
                 pre_chain_id = chain_id
-            line = file.readline()
+            line = next(file,'')
     print("Extracting %d/%d atoms for receptor, %d/%d atoms for ligand"%(len(receptor_list),count_r,len(ligand_list),count_l))
-    final_receptor, final_ligand=Form_interface(rlist,llist,receptor_list,ligand_list)
-    #write that into our path
-    rpath=Write_Interface(final_receptor,pdb_path,".rinterface")
-    lpath=Write_Interface(final_ligand, pdb_path, ".linterface")
-    return rpath,lpath
+    final_receptor, final_ligand, interface_stats=Form_interface(rlist,llist,receptor_list,ligand_list)
+    if stats is not None:
+        stats.update(interface_stats)
+    return Filter_Interface(final_receptor),Filter_Interface(final_ligand)
+def Residue_Coordinates(residue_list):
+    """
+    flatten residue-grouped atoms into coordinate arrays
+    :param residue_list: list of residues, each residue is a list of [x,y,z,atom_type,atom_index]
+    :return:
+    coords: atom_number*3 coordinate array; residue_index: residue id of each atom
+    """
+    residue_len = [len(residue) for residue in residue_list]
+    coords = np.array([atom[:3] for residue in residue_list for atom in residue], dtype=np.float64).reshape(-1, 3)
+    residue_index = np.repeat(np.arange(len(residue_list)), residue_len)
+    return coords, residue_index
+
+def Interface_Residues(rcoords,rresidue,lcoords,lresidue,cut_off=10,rtree=None):
+    """
+    :param rcoords: receptor atom coordinates
+    :param rresidue: residue id of each receptor atom
+    :param lcoords: ligand atom coordinates
+    :param lresidue: residue id of each ligand atom
+    :param cut_off: distance cut off (angstrom)
+    :param rtree: cKDTree of rcoords built before, None to build it
+    :return:
+    sorted receptor and ligand residue ids with an atom within cut_off of the other chain,
+    receptor-ligand atom pairs within CONTACT_CUT_OFF and within CLASH_CUT_OFF
+    """
+    r_index = []
+    l_index = []
+    contacts = 0
+    clashes = 0
+    if len(rcoords) > 0 and len(lcoords) > 0:
+        #neighbor search with kd-tree instead of comparing all the atom pairs
+        rtree = cKDTree(rcoords) if rtree is None else rtree
+        ltree = cKDTree(lcoords)
+        rcontact = ltree.query_ball_point(rcoords, cut_off, return_length=True)
+        lcontact = rtree.query_ball_point(lcoords, cut_off, return_length=True)
+        r_index = np.unique(rresidue[rcontact > 0]).tolist()
+        l_index = np.unique(lresidue[lcontact > 0]).tolist()
+        #atom pair counts for the geometric pre-filter, cheap with both trees built
+        contacts = int(rtree.count_neighbors(ltree, CONTACT_CUT_OFF))
+        clashes = int(rtree.count_neighbors(ltree, CLASH_CUT_OFF))
+    return r_index, l_index, contacts, clashes
+
 @set_timeout(100000, after_timeout)
 def Form_interface(rlist,llist,receptor_list,ligand_list,cut_off=10):
-
-    cut_off=cut_off**2
-    r_index=set()
-    l_index=set()
-    for rindex,item1 in enumerate(rlist):
-        for lindex,item2 in enumerate(llist):
-            min_distance=1000000
-            residue1_len=len(item1)
-            residue2_len=len(item2)
-            for m in range(residue1_len):
-                atom1=item1[m]
-                for n in range(residue2_len):
-                    atom2=item2[n]
-                    distance=0
-                    for k in range(3):
-                        distance+=(atom1[k]-atom2[k])**2
-                    #distance=np.linalg.norm(atom1[:3]-atom2[:3])
-                    if distance<=min_distance:
-                        min_distance=distance
-            if min_distance<=cut_off:
-                if rindex not in r_index:
-                    r_index.add(rindex)
-                if lindex not in l_index:
-                    l_index.add(lindex)
-    r_index=list(r_index)
-    l_index=list(l_index)
+    """
+    keep residues that have at least one atom within cut_off of the other chain
+    :param rlist: receptor residue list
+    :param llist: ligand residue list
+    :param receptor_list: receptor pdb lines
+    :param ligand_list: ligand pdb lines
+    :param cut_off: distance cut off (angstrom)
+    :return:
+    pdb lines of receptor interface and ligand interface, dict of residues, contacts and clashes counts
+    """
+    rcoords, rresidue = Residue_Coordinates(rlist)
+    lcoords, lresidue = Residue_Coordinates(llist)
+    r_index, l_index, contacts, clashes = Interface_Residues(rcoords, rresidue, lcoords, lresidue, cut_off)
     newrlist=[]
     for k in range(len(r_index)):
         newrlist.append(rlist[r_index[k]])
@@ -173,15 +219,16 @@ def Form_interface(rlist,llist,receptor_list,ligand_list,cut_off=10):
             final_ligand.append(ligand_list[our_index])
     print("After filtering the interface region, %d receptor, %d ligand"%(len(final_receptor),len(final_ligand)))
 
-    return final_receptor,final_ligand
+    stats={'residues':len(newrlist)+len(newllist),'contacts':contacts,'clashes':clashes}
+    return final_receptor,final_ligand,stats
+
+def Filter_Interface(line_list):
+    #check residue in the common residue or not. If not, remove this residue
+    return [line for line in line_list if line[17:20] not in RESIDUE_Forbidden_SET]
 
 def Write_Interface(line_list,pdb_path,ext_file):
     new_path=pdb_path[:-4]+ext_file
     with open(new_path,'w') as file:
-        for line in line_list:
-            #check residue in the common residue or not. If not, no write for this residue
-            residue_type = line[17:20]
-            if residue_type in RESIDUE_Forbidden_SET:
-                continue
+        for line in Filter_Interface(line_list):
             file.write(line)
     return new_path
@@ -0,0 +1,127 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import hashlib
+import zipfile
+import numpy as np
+from data_processing.PDB_Reader import Structure_Lines
+#version of the prepared input format, bump it whenever Form_Sample changes its output so that older entries are not reused
+FEATURE_VERSION=2
+
+def Structure_Key(structure_path,*params):
+    """
+    :param structure_path: pdb path or PDB_Model
+    :param params: extraction parameters that change the saved input
+    :return:
+    hex digest of the feature version, atom names, residues, chains, coordinates and elements, plus params
+    """
+    digest=hashlib.sha1()
+    digest.update(("version %d\n"%FEATURE_VERSION).encode())
+    with Structure_Lines(structure_path) as file:
+        for line in file:
+            if line[:4]=='ATOM':
+                #skip serial number, occupancy and b-factor, they do not change the features
+                digest.update((line[12:54]+line[66:80].rstrip()+"\n").encode())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+class Feature_Cache(object):
+    """
+    content-addressed cache of prepared inputs, keyed by the atom records of the pdb and the extraction parameters.
+    least recently used entries are evicted when the cache grows over max_size.
+    """
+    def __init__(self,cache_dir,max_size=10240,check_interval=64):
+        """
+        :param cache_dir: directory to keep the cached inputs as npz files
+        :param max_size: size limit of the cache (MB)
+        :param check_interval: number of saves between two eviction checks
+        """
+        self.cache_dir=os.path.abspath(cache_dir)
+        self.max_size=max_size*1024*1024
+        self.check_interval=check_interval
+        self.save_count=0
+        os.makedirs(self.cache_dir,exist_ok=True)
+
+    def Get_Key(self,structure_path,*params):
+        return Structure_Key(structure_path,*params)
+
+    def Cache_Path(self,key):
+        return os.path.join(self.cache_dir,key+".npz")
+
+    def Load(self,key):
+        """
+        :return: cached sample of key, None if key is not in the cache
+        """
+        cache_path=self.Cache_Path(key)
+        try:
+            with np.load(cache_path) as data:
+                sample={name:data[name] for name in data.files}
+            os.utime(cache_path)#mark as recently used
+        except (OSError,ValueError,zipfile.BadZipFile):
+            return None
+        return sample
+
+    def Save(self,key,sample):
+        cache_path=self.Cache_Path(key)
+        tmp_path=cache_path+".%d.tmp"%os.getpid()
+        with open(tmp_path,'wb') as file:
+            np.savez(file,**sample)
+        os.replace(tmp_path,cache_path)#atomic, other processes never read a partial file
+        self.save_count+=1
+        if self.save_count%self.check_interval==0:
+            self.Evict()
+
+    def Evict(self):
+        """
+        remove least recently used entries until the cache fits in max_size
+        """
+        entries=[]
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat=entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime,stat.st_size,entry.path))
+        total_size=sum(item[1] for item in entries)
+        entries.sort()
+        for mtime,size,path in entries:
+            if total_size<=self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size-=size
@@ -55,14 +55,71 @@ def atom_feature(m, atom_i):
                     one_of_k_encoding_unk(atom.GetImplicitValence(), [0, 1, 2, 3, 4, 5]) +
                     [atom.GetIsAromatic()])    # (10, 6, 5, 6, 1) --> total 28
 
-def get_atom_feature(m, is_ligand=True):
+ATOM_SYMBOL = ['C', 'N', 'O', 'S', 'F', 'P', 'Cl', 'Br', 'B', 'H']
+SYMBOL_INDEX = {symbol: k for k, symbol in enumerate(ATOM_SYMBOL)}
+# column offset and number of categories of each one-hot block, same layout as atom_feature
+DEGREE_OFFSET, DEGREE_SIZE = 10, 6
+NUMHS_OFFSET, NUMHS_SIZE = 16, 5
+VALENCE_OFFSET, VALENCE_SIZE = 21, 6
+AROMATIC_OFFSET = 27
+N_ATOM_FEATURE = 28
+
+def encoding_unk_index(x, size):
+    """Vectorized one_of_k_encoding_unk for allowable set [0,size), returns the hot column."""
+    return np.where((x >= 0) & (x < size), x, size - 1)
+
+def atom_properties(m):
+    """
+    properties used by atom_feature of every atom in a molecule
+    :param m: rdkit molecule
+    :return:
+    dict of symbol index, degree, numhs, valence and aromatic arrays
+    """
     n = m.GetNumAtoms()
-    H = []
-    for i in range(n):
-        H.append(atom_feature(m, i))
-    H = np.array(H)
-    if is_ligand:
-        H = np.concatenate([H, np.zeros((n,28))], 1)
+    symbol = np.empty(n, dtype=np.int64)
+    degree = np.empty(n, dtype=np.int64)
+    numhs = np.empty(n, dtype=np.int64)
+    valence = np.empty(n, dtype=np.int64)
+    aromatic = np.empty(n, dtype=bool)
+    for i, atom in enumerate(m.GetAtoms()):
+        symbol[i] = SYMBOL_INDEX.get(atom.GetSymbol(), len(ATOM_SYMBOL) - 1)
+        degree[i] = atom.GetDegree()
+        numhs[i] = atom.GetTotalNumHs()
+        valence[i] = atom.GetImplicitValence()
+        aromatic[i] = atom.GetIsAromatic()
+    return {'symbol': symbol, 'degree': degree, 'numhs': numhs, 'valence': valence, 'aromatic': aromatic}
+
+def fill_atom_feature(properties, is_ligand=True, out=None):
+    """
+    one-hot encode atom properties, same layout as atom_feature
+    :param properties: dict returned by atom_properties (or Residue_Template.Template_Graph)
+    :param is_ligand: ligand features fill the first 28 columns, receptor features the last 28 columns
+    :param out: optional preallocated n*56 buffer to write into
+    :return:
+    n*56 float32 feature matrix
+    """
+    n = len(properties['symbol'])
+    if out is None:
+        H = np.zeros((n, 2 * N_ATOM_FEATURE), dtype=np.float32)
     else:
-        H = np.concatenate([np.zeros((n,28)), H], 1)
-    return H
\ No newline at end of file
+        H = out
+        H[:] = 0
+    offset = 0 if is_ligand else N_ATOM_FEATURE
+    rows = np.arange(n)
+    H[rows, offset + properties['symbol']] = 1
+    H[rows, offset + DEGREE_OFFSET + encoding_unk_index(properties['degree'], DEGREE_SIZE)] = 1
+    H[rows, offset + NUMHS_OFFSET + encoding_unk_index(properties['numhs'], NUMHS_SIZE)] = 1
+    H[rows, offset + VALENCE_OFFSET + encoding_unk_index(properties['valence'], VALENCE_SIZE)] = 1
+    H[:, offset + AROMATIC_OFFSET] = properties['aromatic']
+    return H
+
+def get_atom_feature(m, is_ligand=True, out=None):
+    """
+    batched version of stacking atom_feature for every atom
+    :param m: rdkit molecule
+    :param is_ligand: ligand features fill the first 28 columns, receptor features the last 28 columns
+    :param out: optional preallocated n*56 buffer to write into
+    :return:
+    n*56 float32 feature matrix
+    """
+    return fill_atom_feature(atom_properties(m), is_ligand, out)
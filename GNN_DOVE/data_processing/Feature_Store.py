@@ -0,0 +1,158 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import json
+import numpy as np
+
+class Feature_Store(object):
+    """
+    prepared inputs of many decoys packed into a few large shard files, with an offset index.
+    shards are opened with np.memmap, so loading a decoy returns views of the shard without copying.
+    """
+    def __init__(self,store_dir,shard_size=1024,sparse=False,check_interval=256,alignment=64):
+        """
+        :param store_dir: directory of the shard files and index.json
+        :param shard_size: size of one shard file (MB), a new shard is started when it is exceeded
+        :param sparse: format of the stored inputs, must match an existing store
+        :param check_interval: number of appends between two index writes
+        :param alignment: byte alignment of every array in the shards
+        """
+        self.store_dir=os.path.abspath(store_dir)
+        self.shard_size=shard_size*1024*1024
+        self.check_interval=check_interval
+        self.alignment=alignment
+        self.index_path=os.path.join(self.store_dir,"index.json")
+        os.makedirs(self.store_dir,exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path,'r') as file:
+                index=json.load(file)
+            if index['sparse']!=bool(sparse):
+                raise ValueError("feature store %s keeps %s inputs"%(self.store_dir,"sparse" if index['sparse'] else "dense"))
+        else:
+            index={'sparse':bool(sparse),'shards':[],'samples':{}}
+        self.index=index
+        self.writer=None
+        self.append_count=0
+        self.shards={}
+
+    def __getstate__(self):
+        #memmaps and the open writer are not shared with other processes, they are reopened on demand
+        state=self.__dict__.copy()
+        state['writer']=None
+        state['shards']={}
+        return state
+
+    def __contains__(self,name):
+        return name in self.index['samples']
+
+    def Has(self,name,key,required=()):
+        """
+        :param key: Structure_Key of the decoy, names alone are reused by other targets and changed pdbs
+        :param required: names of arrays the stored input must have
+        :return: True if the stored input of name was prepared from the same structure and has the required arrays
+        """
+        entry=self.index['samples'].get(name)
+        return entry is not None and entry.get('key')==key and all(array_name in entry['arrays'] for array_name in required)
+
+    def __len__(self):
+        return len(self.index['samples'])
+
+    def Shard_Path(self,shard_id):
+        return os.path.join(self.store_dir,self.index['shards'][shard_id])
+
+    def Append(self,name,sample,key=None):
+        """
+        :param name: decoy name to load the sample later
+        :param sample: dict of arrays
+        :param key: Structure_Key of the decoy, checked by Has, replaces an earlier entry of name
+        """
+        if self.writer is None and len(self.index['shards'])>0:
+            #keep filling the last shard of an existing store
+            self.writer=open(self.Shard_Path(len(self.index['shards'])-1),'ab')
+        if self.writer is None or self.writer.tell()>=self.shard_size:
+            self.Close_Writer()
+            self.index['shards'].append("shard_%05d.bin"%len(self.index['shards']))
+            self.writer=open(self.Shard_Path(len(self.index['shards'])-1),'ab')
+        arrays={}
+        for array_name,value in sample.items():
+            value=np.ascontiguousarray(value)
+            offset=self.writer.tell()
+            padding=-offset%self.alignment
+            self.writer.write(b"\0"*padding)
+            arrays[array_name]=[offset+padding,value.dtype.str,list(value.shape)]
+            self.writer.write(value.tobytes())
+        self.index['samples'][name]={'shard':len(self.index['shards'])-1,'arrays':arrays,'key':key}
+        self.append_count+=1
+        if self.append_count%self.check_interval==0:
+            self.Write_Index()
+
+    def Load(self,name):
+        """
+        :return: dict of read-only arrays viewing the shard file
+        """
+        entry=self.index['samples'][name]
+        shard_id=entry['shard']
+        end=max([offset+np.dtype(dtype).itemsize*int(np.prod(shape)) for offset,dtype,shape in entry['arrays'].values()]+[0])
+        shard=self.shards.get(shard_id)
+        if shard is None or len(shard)<end:
+            if self.writer is not None and shard_id==len(self.index['shards'])-1:
+                self.writer.flush()
+            shard=np.memmap(self.Shard_Path(shard_id),dtype=np.uint8,mode='r')
+            self.shards[shard_id]=shard
+        sample={}
+        for key,(offset,dtype,shape) in entry['arrays'].items():
+            nbytes=np.dtype(dtype).itemsize*int(np.prod(shape))
+            sample[key]=shard[offset:offset+nbytes].view(dtype).reshape(shape)
+        return sample
+
+    def Write_Index(self):
+        if self.writer is not None:
+            self.writer.flush()
+        tmp_path=self.index_path+".%d.tmp"%os.getpid()
+        with open(tmp_path,'w') as file:
+            json.dump(self.index,file)
+        os.replace(tmp_path,self.index_path)#atomic, readers never see a partial index
+
+    def Close_Writer(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer=None
+
+    def Close(self):
+        """
+        write the index and close the current shard
+        """
+        self.Write_Index()
+        self.Close_Writer()
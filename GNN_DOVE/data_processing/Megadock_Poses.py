@@ -0,0 +1,148 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import numpy as np
+from data_processing.PDB_Reader import PDB_Model,Open_PDB
+
+def Read_Out(out_path,num_poses=0):
+    """
+    parse a MEGADOCK .out file, same fields as parse_out of decoygen
+    :param out_path: MEGADOCK .out path
+    :param num_poses: number of top poses to read, 0 for all of them
+    :return:
+    dict of N, spacing, rand (initial ligand rotation), receptor, r_center, ligand, l_center,
+    and poses: num_poses*7 array of the 3 rotation angles, 3 grid translations and the score
+    """
+    with open(out_path,'r') as file:
+        N,spacing=file.readline().split()[:2]
+        rand=[float(x) for x in file.readline().split()[:3]]
+        receptor=file.readline().split()
+        ligand=file.readline().split()
+        poses=[]
+        for line in file:
+            items=line.split()
+            if len(items)<7:
+                continue
+            poses.append([float(x) for x in items[:7]])
+            if num_poses>0 and len(poses)>=num_poses:
+                break
+    return {'N':int(N),'spacing':float(spacing),'rand':np.array(rand),
+            'receptor':receptor[0],'r_center':np.array([float(x) for x in receptor[1:4]]),
+            'ligand':ligand[0],'l_center':np.array([float(x) for x in ligand[1:4]]),
+            'poses':np.array(poses,dtype=np.float64).reshape(-1,7)}
+
+def Rotation_Matrix(psi,theta,phi):
+    #z-x-z euler rotation of rotateAtom in decoygen
+    return np.array([[np.cos(psi)*np.cos(phi)-np.sin(psi)*np.cos(theta)*np.sin(phi),
+                      -np.cos(psi)*np.sin(phi)-np.sin(psi)*np.cos(theta)*np.cos(phi),
+                      np.sin(psi)*np.sin(theta)],
+                     [np.sin(psi)*np.cos(phi)+np.cos(psi)*np.cos(theta)*np.sin(phi),
+                      -np.sin(psi)*np.sin(phi)+np.cos(psi)*np.cos(theta)*np.cos(phi),
+                      -np.cos(psi)*np.sin(theta)],
+                     [np.sin(theta)*np.sin(phi),np.sin(theta)*np.cos(phi),np.cos(theta)]])
+
+def Pose_Coordinates(coords,out,pose):
+    """
+    move the ligand to a docking pose, same as createPDB of decoygen
+    :param coords: ligand atom_number*3 coordinates of the input ligand pdb
+    :param out: Read_Out of the docking run
+    :param pose: one row of out['poses']
+    :return:
+    atom_number*3 coordinates of the posed ligand
+    """
+    rotation=Rotation_Matrix(*pose[:3]).dot(Rotation_Matrix(*out['rand']))
+    shift=pose[3:6].astype(np.int64)
+    #grid indices past half of the fft box are negative translations
+    shift[shift>=out['N']//2]-=out['N']
+    return (coords-out['l_center']).dot(rotation.T)-shift*out['spacing']+out['r_center']
+
+def Read_Atoms(pdb_path,chain_id):
+    """
+    :param pdb_path: receptor or ligand pdb path
+    :param chain_id: chain written for all the atoms, GNN_DOVE expects A for the receptor and B for the ligand
+    :return:
+    ATOM/HETATM lines with the chain replaced, atom_number*3 coordinates
+    """
+    lines=[]
+    with Open_PDB(pdb_path) as file:
+        for line in file:
+            if line[:6] in ("ATOM  ","HETATM"):
+                lines.append(line[:21]+chain_id+line[22:])
+    coords=np.array([[float(line[30:38]),float(line[38:46]),float(line[46:54])] for line in lines]).reshape(-1,3)
+    return lines,coords
+
+def Out_Paths(out_path,receptor_path='',ligand_path=''):
+    """
+    :return:
+    receptor and ligand pdb paths, the ones in the .out header when not given,
+    relative to the current directory or to the directory of the .out file
+    """
+    out=Read_Out(out_path,1)
+    paths=[]
+    for path,header_path in ((receptor_path,out['receptor']),(ligand_path,out['ligand'])):
+        if not path:
+            path=header_path
+            if not os.path.isabs(path) and not os.path.exists(path):
+                path=os.path.join(os.path.split(os.path.abspath(out_path))[0],path)
+        paths.append(os.path.abspath(path))
+    return paths
+
+def Pose_Names(out_path,num_poses=0):
+    """
+    :return: [out file stem]_[pose rank] of the poses, same order as Read_Poses
+    """
+    stem=os.path.split(out_path)[1][:-4]
+    count=len(Read_Out(out_path,num_poses)['poses'])
+    return ["%s_%d"%(stem,k+1) for k in range(count)]
+
+def Read_Poses(out_path,receptor_path='',ligand_path='',num_poses=0):
+    """
+    complexes of the docking poses in memory, without writing the decoy pdbs of decoygen
+    :param out_path: MEGADOCK .out path
+    :param receptor_path: receptor pdb, empty for the one in the .out header
+    :param ligand_path: ligand pdb used for docking, empty for the one in the .out header
+    :param num_poses: number of top poses, 0 for all of them
+    :return:
+    generator of PDB_Model, receptor as chain A and the posed ligand as chain B, named as Pose_Names
+    """
+    receptor_path,ligand_path=Out_Paths(out_path,receptor_path,ligand_path)
+    out=Read_Out(out_path,num_poses)
+    receptor_lines,_=Read_Atoms(receptor_path,"A")
+    ligand_lines,ligand_coords=Read_Atoms(ligand_path,"B")
+    names=Pose_Names(out_path,num_poses)
+    for name,pose in zip(names,out['poses']):
+        coords=Pose_Coordinates(ligand_coords,out,pose)
+        lines=[line[:30]+"%8.3f%8.3f%8.3f"%tuple(xyz)+line[54:] for line,xyz in zip(ligand_lines,coords)]
+        yield PDB_Model(name,receptor_lines+lines)
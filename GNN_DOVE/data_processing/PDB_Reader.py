@@ -0,0 +1,154 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import gzip
+from itertools import zip_longest
+from collections import namedtuple
+from contextlib import contextmanager
+
+#one MODEL/ENDMDL block of a multi-model pdb, kept in memory instead of a file
+PDB_Model = namedtuple("PDB_Model", ["name", "lines"])
+
+def Open_PDB(pdb_path):
+    #text mode for both plain and gzipped pdb files
+    if pdb_path.endswith(".gz"):
+        return gzip.open(pdb_path, 'rt')
+    return open(pdb_path, 'r')
+
+def PDB_Stem(pdb_path):
+    """
+    :return: file name without the .pdb/.pdb.gz extension
+    """
+    name = os.path.split(pdb_path)[1]
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".pdb"):
+        name = name[:-4]
+    return name
+
+def Model_Names(pdb_path):
+    """
+    names of the models in a multi-model pdb, read without keeping any coordinates
+    :param pdb_path: pdb or pdb.gz path
+    :return:
+    list of [stem]_[model serial], same order as Read_Models
+    """
+    stem = PDB_Stem(pdb_path)
+    names = []
+    name_set = set()
+    with Open_PDB(pdb_path) as file:
+        for line in file:
+            if line[:5] == "MODEL":
+                name = Model_Name(stem, line, len(names))
+                #names are the keys of the journal and the feature store
+                if name in name_set:
+                    raise ValueError("duplicate MODEL serial %s in %s" % (line[5:].strip(), pdb_path))
+                name_set.add(name)
+                names.append(name)
+    #a file without MODEL records is one model
+    return names if names else [stem]
+
+def Model_Name(stem, line, index):
+    serial = line[5:].strip()
+    return "%s_%s" % (stem, serial if serial else index + 1)
+
+def Read_Models(pdb_path):
+    """
+    stream the models of a multi-model pdb one at a time
+    :param pdb_path: pdb or pdb.gz path
+    :return:
+    generator of PDB_Model, named as Model_Names
+    """
+    stem = PDB_Stem(pdb_path)
+    count = 0
+    lines = []
+    in_model = False
+    with Open_PDB(pdb_path) as file:
+        for line in file:
+            record = line[:6]
+            if record[:5] == "MODEL":
+                if in_model:
+                    #ENDMDL missing, the open model ends at the next MODEL record
+                    yield PDB_Model(name, lines)
+                    count += 1
+                name = Model_Name(stem, line, count)
+                lines = []
+                in_model = True
+            elif record == "ENDMDL":
+                yield PDB_Model(name, lines)
+                count += 1
+                lines = []
+                in_model = False
+            elif record[:4] == "ATOM" or record == "HETATM" or record[:3] == "TER":
+                lines.append(line)
+    if count == 0 and not in_model:
+        yield PDB_Model(stem, lines)
+    elif in_model:
+        #last model of a truncated file without ENDMDL, still counted by Model_Names
+        yield PDB_Model(name, lines)
+
+def Named_Structures(names, structures):
+    """
+    check that streamed structures match the names read before, so that no score goes to another decoy
+    :param names: list of decoy names, from Model_Names or Pose_Names
+    :param structures: iterable of PDB_Model
+    :return:
+    generator of the PDB_Model of structures
+    """
+    for name, structure in zip_longest(names, structures):
+        if structure is None or name is None or structure.name != name:
+            raise ValueError("model %s does not match the decoy name %s" % (None if structure is None else structure.name, name))
+        yield structure
+
+@contextmanager
+def Structure_Lines(structure):
+    """
+    :param structure: pdb path or PDB_Model
+    :return:
+    iterator over the pdb lines of the structure
+    """
+    if isinstance(structure, PDB_Model):
+        yield iter(structure.lines)
+        return
+    with Open_PDB(structure) as file:
+        yield file
+
+def Structure_Name(structure):
+    """
+    :return: the path of a pdb file, or the name of a PDB_Model
+    """
+    if isinstance(structure, PDB_Model):
+        return structure.name
+    return structure
@@ -33,35 +33,252 @@
 # along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
 
 import os
-from data_processing.Extract_Interface import Extract_Interface
-from rdkit.Chem.rdmolfiles import MolFromPDBFile
-from data_processing.Feature_Processing import get_atom_feature
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from data_processing.Extract_Interface import Get_Interface,Write_Interface
+from rdkit.Chem.rdmolfiles import MolFromPDBBlock
+from data_processing.Feature_Processing import atom_properties,fill_atom_feature
+from data_processing.Residue_Template import Template_Graph
+from data_processing.PDB_Reader import Structure_Name
+from ops.Stage_Profiler import Profile_Stage
 import numpy as np
-from rdkit.Chem.rdmolops import GetAdjacencyMatrix
-from scipy.spatial import distance_matrix
+from scipy.spatial import distance_matrix, cKDTree
 
+#stages of the geometric pre-filter, in the order they are checked,
+#"missing interface stats" drops inputs prepared without the interface counts, which cannot be checked,
+#"empty interface" drops decoys without receptor or ligand atoms within 10A of the other chain, even without thresholds
+FILTER_STAGES = ["interface residues", "atom contacts", "clashes", "missing interface stats", "empty interface"]
+#score of dropped decoys, below any model score so they are ranked last
+FILTERED_SCORE = -1.0
 
-def Prepare_Input(structure_path):
+def Prefilter_Thresholds(params):
+    """
+    :param params: min_residues, min_contacts and max_clashes, 0, 0 and -1 to disable each stage
+    :return:
+    (min_residues, min_contacts, max_clashes), None if every stage is disabled
+    """
+    thresholds = (params.get('min_residues', 0), params.get('min_contacts', 0), params.get('max_clashes', -1))
+    if thresholds == (0, 0, -1):
+        return None
+    return thresholds
+
+def Interface_Stats(interface_stats):
+    #array kept in the samples, same order as the count stages of FILTER_STAGES
+    return np.array([interface_stats['residues'], interface_stats['contacts'], interface_stats['clashes']], dtype=np.int64)
+
+def Filter_Stage(stats,prefilter=None):
+    """
+    :param stats: array of interface residue, atom contact and clash counts, None for an input prepared without them
+    :param prefilter: thresholds from Prefilter_Thresholds, None to pass everything
+    :return:
+    index in FILTER_STAGES of the first stage the decoy fails, -1 if it passes
+    """
+    if prefilter is None:
+        return -1
+    if stats is None:
+        return 3
+    min_residues, min_contacts, max_clashes = prefilter
+    if stats[0] < min_residues:
+        return 0
+    if stats[1] < min_contacts:
+        return 1
+    if max_clashes >= 0 and stats[2] > max_clashes:
+        return 2
+    return -1
+
+def Sample_Stage(sample,prefilter=None):
+    """
+    :param sample: prepared input, only stats for decoys dropped during preparation
+    :param prefilter: thresholds from Prefilter_Thresholds, None to only drop empty interfaces
+    :return:
+    index in FILTER_STAGES of the stage dropping the decoy, -1 if it is scored by the model
+    """
+    stage = Filter_Stage(sample['stats'] if 'stats' in sample else None, prefilter)
+    if stage >= 0:
+        return stage
+    #an empty graph would be scored from the bias terms of the model alone
+    if 'V' not in sample or len(sample['V']) == 0:
+        return len(FILTER_STAGES) - 1
+    return -1
+
+def Mol_Graph(mol):
+    """
+    bonds and atom properties of an rdkit molecule
+    :param mol: rdkit molecule
+    :return:
+    dict of symbol, degree, numhs, valence, aromatic, bonds and coords arrays, same as Template_Graph
+    """
+    graph = atom_properties(mol)
+    graph['bonds'] = np.array([[bond.GetBeginAtomIdx(), bond.GetEndAtomIdx()] for bond in mol.GetBonds()], dtype=np.int64).reshape(-1, 2)
+    graph['coords'] = np.array(mol.GetConformers()[0].GetPositions())
+    return graph
+
+def Form_Graph(line_list):
+    """
+    :param line_list: pdb lines of an interface
+    :return:
+    graph from the residue templates, or from rdkit if there is any non-standard residue
+    """
+    graph = Template_Graph(line_list)
+    if graph is None:
+        graph = Mol_Graph(MolFromPDBBlock("".join(line_list), sanitize=False))
+    return graph
+
+def Bond_Edges(bonds,num_atoms,offset=0):
+    """
+    covalent edges of a molecule, including self loops, same as GetAdjacencyMatrix(mol)+I
+    :param bonds: num_bonds*2 atom index array
+    :param num_atoms: number of atoms
+    :param offset: index of the first atom in the combined graph
+    :return:
+    2*num_edges index array
+    """
+    loops = np.arange(num_atoms, dtype=np.int64)
+    row = np.concatenate([bonds[:, 0], bonds[:, 1], loops])
+    col = np.concatenate([bonds[:, 1], bonds[:, 0], loops])
+    return np.stack([row, col], 0) + offset
+
+def Radius_Edges(d1,d2,offset,cut_off=10):
+    """
+    receptor-ligand edges within cut_off, both directions
+    :param d1: receptor coordinates
+    :param d2: ligand coordinates
+    :param offset: index of the first ligand atom in the combined graph
+    :param cut_off: distance cut off (angstrom)
+    :return:
+    2*num_edges index array, distance of each edge
+    """
+    # small margin so that float32 rounding is decided by the model, which applies the exact cut off
+    neighbors = cKDTree(d2).query_ball_point(d1, cut_off + 1e-3)
+    row = np.repeat(np.arange(len(d1), dtype=np.int64), [len(item) for item in neighbors])
+    col = np.array([k for item in neighbors for k in item], dtype=np.int64)
+    distance = np.linalg.norm(d1[row] - d2[col], axis=1)
+    index = np.stack([np.concatenate([row, col + offset]), np.concatenate([col + offset, row])], 0)
+    return index, np.concatenate([distance, distance])
+
+def Prepare_Input(structure_path,sparse=False,cache=None):
+    """
+    prepare the input and save it with the interface files beside structure_path
+    :return:
+    path of the saved Input.npz
+    """
+    Prepare_Sample(structure_path,sparse,cache,save_input=True)
+    return os.path.join(os.path.split(structure_path)[0],"Input.npz")
+
+def Prepare_Sample(structure_path,sparse=False,cache=None,save_input=False,prefilter=None,reuse_graphs=False):
+    """
+    prepare the input in memory
+    :param structure_path: docking model path, or PDB_Model of a multi-model pdb
+    :param sparse: edge lists instead of dense adjacency matrices
+    :param cache: Feature_Cache to reuse inputs prepared before, None to disable
+    :param save_input: also write Input.rinterface, Input.linterface and Input.npz beside structure_path, only for paths
+    :param prefilter: thresholds from Prefilter_Thresholds, decoys failing them are not featurized
+    :param reuse_graphs: rigid-body decoys of one docking run, build the receptor and ligand graphs once with Decoy_Set_Sample
+    :return:
+    dict of H, A1, A2 (A1_index, A1_value, A2_index, A2_value for sparse), V and stats arrays,
+    only stats for filtered decoys and decoys without interface, see Sample_Stage
+    """
+    name=Structure_Name(structure_path)
+    sample=None
+    if cache is not None:
+        #10A interface cut off, the pre-filter is applied to the stats of the cached features after lookup
+        key=cache.Get_Key(structure_path,sparse,10)
+        with Profile_Stage("load",name):
+            sample=cache.Load(key)
+        if sample is not None and prefilter is not None and 'stats' not in sample:
+            #prepared before the interface counts were kept, extracted again to check them
+            sample=None
+    if sample is None:
+        if reuse_graphs:
+            #imported here, Decoy_Set builds its samples with the functions of this module
+            from data_processing.Decoy_Set import Decoy_Set_Sample
+            sample=Decoy_Set_Sample(structure_path,sparse,save_input,prefilter)
+        if sample is None:
+            sample=Form_Sample(structure_path,sparse,save_input,prefilter)
+        #only features are cached, decoys dropped before featurization are extracted again by later runs
+        if cache is not None and 'V' in sample:
+            cache.Save(key,sample)
+    if save_input:
+        with Profile_Stage("npz write",name):
+            np.savez(os.path.join(os.path.split(structure_path)[0],"Input.npz"), **sample)
+    return sample
+
+def Form_Sample(structure_path,sparse=False,save_input=False,prefilter=None):
     # extract the interface region
-    root_path=os.path.split(structure_path)[0]
-    receptor_path, ligand_path = Extract_Interface(structure_path)
-    receptor_mol = MolFromPDBFile(receptor_path, sanitize=False)
-    ligand_mol = MolFromPDBFile(ligand_path, sanitize=False)
-    receptor_count = receptor_mol.GetNumAtoms()
-    ligand_count = ligand_mol.GetNumAtoms()
-    receptor_feature = get_atom_feature(receptor_mol, is_ligand=False)
-    ligand_feature = get_atom_feature(ligand_mol, is_ligand=True)
+    name = Structure_Name(structure_path)
+    interface_stats = {}
+    with Profile_Stage("interface", name):
+        receptor_lines, ligand_lines = Get_Interface(structure_path, interface_stats)
+    stats = Interface_Stats(interface_stats)
+    if Filter_Stage(stats, prefilter) >= 0:
+        # ranked last without building the graphs
+        return {'stats': stats}
+    if len(receptor_lines) == 0 or len(ligand_lines) == 0:
+        # no interface, ranked last as "empty interface" instead of scoring an empty graph
+        print("No receptor-ligand interface within 10A in %s" % name)
+        return {'stats': stats}
+    if save_input:
+        Write_Interface(receptor_lines, structure_path, ".rinterface")
+        Write_Interface(ligand_lines, structure_path, ".linterface")
+    with Profile_Stage("parse", name):
+        receptor_graph = Form_Graph(receptor_lines)
+        ligand_graph = Form_Graph(ligand_lines)
+    with Profile_Stage("featurize", name):
+        sample = Graph_Sample(receptor_graph, ligand_graph, sparse)
+    sample['stats'] = stats
+    return sample
+
+def Graph_Sample(receptor_graph,ligand_graph,sparse=False):
+    """
+    :param receptor_graph: graph of the receptor interface, from Form_Graph
+    :param ligand_graph: graph of the ligand interface, from Form_Graph
+    :param sparse: edge lists instead of dense adjacency matrices
+    :return:
+    dict of H, A1, A2 (A1_index, A1_value, A2_index, A2_value for sparse) and V arrays
+    """
+    receptor_count = len(receptor_graph['symbol'])
+    ligand_count = len(ligand_graph['symbol'])
+    H = np.zeros((receptor_count + ligand_count, 56), dtype=np.float32)
+    fill_atom_feature(receptor_graph, is_ligand=False, out=H[:receptor_count])
+    fill_atom_feature(ligand_graph, is_ligand=True, out=H[receptor_count:])
 
+    d1 = receptor_graph['coords']
+    d2 = ligand_graph['coords']
+    # node indice for aggregation
+    valid = np.zeros((receptor_count + ligand_count,))
+    valid[:receptor_count] = 1
+    if sparse:
+        return Prepare_Sparse_Input(receptor_graph,ligand_graph,d1,d2,H,valid)
+    else:
+        return Prepare_Dense_Input(receptor_graph,ligand_graph,d1,d2,H,valid)
+
+def Prepare_Sparse_Input(receptor_graph,ligand_graph,d1,d2,H,valid):
+    # edge lists instead of dense matrices, A2 only keeps receptor-ligand pairs within 10A
+    receptor_count = len(d1)
+    A1_index = np.concatenate([Bond_Edges(receptor_graph['bonds'], receptor_count),
+                               Bond_Edges(ligand_graph['bonds'], len(d2), receptor_count)], 1)
+    A1_value = np.ones(A1_index.shape[1])
+    cross_index, cross_distance = Radius_Edges(d1, d2, receptor_count)
+    A2_index = np.concatenate([A1_index, cross_index], 1)
+    A2_value = np.concatenate([A1_value, cross_distance])
+    return {'H': H, 'A1_index': A1_index, 'A1_value': A1_value, 'A2_index': A2_index, 'A2_value': A2_value, 'V': valid}
+
+def Adjacency_Matrix(bonds,num_atoms):
+    #same as rdkit GetAdjacencyMatrix
+    adj = np.zeros((num_atoms, num_atoms), dtype=np.int32)
+    adj[bonds[:, 0], bonds[:, 1]] = 1
+    adj[bonds[:, 1], bonds[:, 0]] = 1
+    return adj
+
+def Prepare_Dense_Input(receptor_graph,ligand_graph,d1,d2,H,valid):
+    receptor_count = len(d1)
+    ligand_count = len(d2)
     # get receptor adj matrix
-    c1 = receptor_mol.GetConformers()[0]
-    d1 = np.array(c1.GetPositions())
-    adj1 = GetAdjacencyMatrix(receptor_mol) + np.eye(receptor_count)
+    adj1 = Adjacency_Matrix(receptor_graph['bonds'], receptor_count) + np.eye(receptor_count)
     # get ligand adj matrix
-    c2 = ligand_mol.GetConformers()[0]
-    d2 = np.array(c2.GetPositions())
-    adj2 = GetAdjacencyMatrix(ligand_mol) + np.eye(ligand_count)
+    adj2 = Adjacency_Matrix(ligand_graph['bonds'], ligand_count) + np.eye(ligand_count)
     # combine analysis
-    H = np.concatenate([receptor_feature, ligand_feature], 0)
     agg_adj1 = np.zeros((receptor_count + ligand_count, receptor_count + ligand_count))
     agg_adj1[:receptor_count, :receptor_count] = adj1
     agg_adj1[receptor_count:, receptor_count:] = adj2  # array without r-l interaction
@@ -69,10 +286,6 @@ def Prepare_Input(structure_path):
     agg_adj2 = np.copy(agg_adj1)
     agg_adj2[:receptor_count, receptor_count:] = np.copy(dm)
     agg_adj2[receptor_count:, :receptor_count] = np.copy(np.transpose(dm))  # with interaction array
-    # node indice for aggregation
-    valid = np.zeros((receptor_count + ligand_count,))
-    valid[:receptor_count] = 1
-    input_file=os.path.join(root_path,"Input.npz")
     # sample = {
     #     'H': H.tolist(),
     #     'A1': agg_adj1.tolist(),
@@ -80,5 +293,34 @@ def Prepare_Input(structure_path):
     #     'V': valid,
     #     'key': structure_path,
     # }
-    np.savez(input_file,  H=H, A1=agg_adj1, A2=agg_adj2, V=valid)
-    return input_file
+    return {'H': H, 'A1': agg_adj1, 'A2': agg_adj2, 'V': valid}
+
+
+def Prepare_Input_Stream(structure_list,num_workers=4,queue_size=64,sparse=False,cache=None,save_input=False,prefilter=None,reuse_graphs=False):
+    """
+    prepare inputs on a process pool, keeping at most queue_size structures in flight
+    :param structure_list: iterable of docking model paths or PDB_Model, consumed as the queue has room
+    :param num_workers: number of processes for input preparation
+    :param queue_size: maximum number of submitted structures that are not consumed yet
+    :param sparse: edge lists instead of dense adjacency matrices
+    :param cache: Feature_Cache to reuse inputs prepared before, None to disable
+    :param save_input: also write the interface files and Input.npz beside each structure
+    :param prefilter: thresholds from Prefilter_Thresholds, None to disable
+    :param reuse_graphs: build the receptor and ligand graphs once per process for rigid-body decoys
+    :return:
+    generator of prepared samples, in the same order as structure_list
+    """
+    if num_workers<=1:
+        for structure_path in structure_list:
+            yield Prepare_Sample(structure_path,sparse,cache,save_input,prefilter,reuse_graphs)
+        return
+    queue_size=max(queue_size,num_workers)
+    pending=deque()
+    #spawn instead of fork so that workers never inherit a CUDA context from the parent
+    with ProcessPoolExecutor(max_workers=num_workers,mp_context=get_context("spawn")) as executor:
+        for structure_path in structure_list:
+            if len(pending)>=queue_size:
+                yield pending.popleft().result()
+            pending.append(executor.submit(Prepare_Sample,structure_path,sparse,cache,save_input,prefilter,reuse_graphs))
+        while pending:
+            yield pending.popleft().result()
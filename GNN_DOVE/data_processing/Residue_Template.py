@@ -0,0 +1,176 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import numpy as np
+from scipy.spatial import cKDTree
+from data_processing.Feature_Processing import SYMBOL_INDEX
+
+# intra-residue bonds of the 20 standard amino acids, "-" single bond, "=" double bond,
+# same bond orders as rdkit assigns to standard residues when reading a pdb file
+BACKBONE_BONDS = "N-CA CA-C C=O C-OXT"
+SIDECHAIN_BONDS = {
+    "ALA": "CA-CB",
+    "ARG": "CA-CB CB-CG CG-CD CD-NE NE-CZ CZ-NH1 CZ=NH2",
+    "ASN": "CA-CB CB-CG CG=OD1 CG-ND2",
+    "ASP": "CA-CB CB-CG CG=OD1 CG-OD2",
+    "CYS": "CA-CB CB-SG",
+    "GLN": "CA-CB CB-CG CG-CD CD=OE1 CD-NE2",
+    "GLU": "CA-CB CB-CG CG-CD CD=OE1 CD-OE2",
+    "GLY": "",
+    "HIS": "CA-CB CB-CG CG-ND1 CG=CD2 ND1=CE1 CE1-NE2 CD2-NE2",
+    "ILE": "CA-CB CB-CG1 CB-CG2 CG1-CD1",
+    "LEU": "CA-CB CB-CG CG-CD1 CG-CD2",
+    "LYS": "CA-CB CB-CG CG-CD CD-CE CE-NZ",
+    "MET": "CA-CB CB-CG CG-SD SD-CE",
+    "PHE": "CA-CB CB-CG CG=CD1 CG-CD2 CD1-CE1 CD2=CE2 CE1=CZ CE2-CZ",
+    "PRO": "CA-CB CB-CG CG-CD CD-N",
+    "SER": "CA-CB CB-OG",
+    "THR": "CA-CB CB-OG1 CB-CG2",
+    "TRP": "CA-CB CB-CG CG=CD1 CG-CD2 CD1-NE1 NE1-CE2 CD2=CE2 CD2-CE3 CE2-CZ2 CE3=CZ3 CZ3-CH2 CZ2=CH2",
+    "TYR": "CA-CB CB-CG CG=CD1 CG-CD2 CD1-CE1 CD2=CE2 CE1=CZ CE2-CZ CZ-OH",
+    "VAL": "CA-CB CB-CG1 CB-CG2",
+}
+# covalent radius and allowed valences of the elements in standard residues, same as rdkit's periodic table
+COVALENT_RADIUS = {"C": 0.76, "N": 0.71, "O": 0.66, "S": 1.05}
+ATOM_VALENCE = {"C": (4,), "N": (3,), "O": (2,), "S": (2, 4, 6)}
+# two atoms of different residues are bonded if their distance is within the sum of covalent radii plus this tolerance
+BOND_TOLERANCE = 0.45
+
+def Parse_Template(bond_string):
+    """
+    :param bond_string: bonds separated by spaces, such as "CA-CB CG=CD1"
+    :return:
+    dict from atom name to the list of (bonded atom name, bond order)
+    """
+    template = {}
+    for bond in bond_string.split():
+        order = 2 if "=" in bond else 1
+        atom1, atom2 = bond.replace("=", "-").split("-")
+        template.setdefault(atom1, []).append((atom2, order))
+        template.setdefault(atom2, []).append((atom1, order))
+    return template
+
+RESIDUE_TEMPLATE = {residue: Parse_Template(BACKBONE_BONDS + " " + bonds) for residue, bonds in SIDECHAIN_BONDS.items()}
+
+def Template_Graph(line_list):
+    """
+    bonds and atom properties of pdb lines from the residue templates, without building an rdkit molecule.
+    Intra-residue bonds come from RESIDUE_TEMPLATE, bonds between residues (peptide bonds, disulfide bonds)
+    are detected from the distance of the atoms.
+    :param line_list: pdb ATOM lines
+    :return:
+    dict of symbol, degree, numhs, valence, aromatic, bonds, orders and coords arrays,
+    None if any atom is not covered by the templates (non-standard residue, hydrogen, alternate location)
+    """
+    n = len(line_list)
+    symbol = []
+    residue_index = np.zeros(n, dtype=np.int64)
+    bonds = []
+    orders = []
+    residue = -1
+    for i, line in enumerate(line_list):
+        if i == 0 or line[17:27] != line_list[i - 1][17:27]:
+            residue += 1
+            template = RESIDUE_TEMPLATE.get(line[17:20])
+            atom_index = {}
+            if template is None:
+                return None
+        name = line[12:16].strip()
+        element = line[76:78].strip()
+        if line[16] != " " or name not in template or name in atom_index or (element and element.upper() != name[0]):
+            return None
+        for other, order in template[name]:
+            if other in atom_index:
+                bonds.append((atom_index[other], i))
+                orders.append(order)
+        atom_index[name] = i
+        residue_index[i] = residue
+        symbol.append(name[0])
+    coords = np.array([[float(line[30:38]), float(line[38:46]), float(line[46:54])] for line in line_list]).reshape(-1, 3)
+    radius = np.array([COVALENT_RADIUS[item] for item in symbol])
+    if n > 1:
+        pairs = cKDTree(coords).query_pairs(2 * max(COVALENT_RADIUS.values()) + BOND_TOLERANCE, output_type='ndarray')
+        distance = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+        linked = (residue_index[pairs[:, 0]] != residue_index[pairs[:, 1]]) & \
+                 (distance <= radius[pairs[:, 0]] + radius[pairs[:, 1]] + BOND_TOLERANCE)
+        bonds.extend(pairs[linked].tolist())
+        orders.extend([1] * int(linked.sum()))
+    bonds = np.array(bonds, dtype=np.int64).reshape(-1, 2)
+    orders = np.array(orders, dtype=np.int64)
+    graph = Bond_Properties(np.array([SYMBOL_INDEX[item] for item in symbol], dtype=np.int64), bonds, orders)
+    graph['coords'] = coords
+    return graph
+
+def Bond_Properties(symbol, bonds, orders):
+    """
+    atom properties that depend on the bonds of the graph
+    :param symbol: SYMBOL_INDEX of each atom
+    :param bonds: num_bonds*2 atom index array
+    :param orders: bond order of each bond
+    :return:
+    dict of symbol, degree, numhs, valence, aromatic, bonds and orders arrays
+    """
+    n = len(symbol)
+    degree = np.bincount(bonds.ravel(), minlength=n)
+    explicit = np.bincount(bonds.ravel(), weights=np.repeat(orders, 2), minlength=n).astype(np.int64)
+    # implicit hydrogens fill up to the smallest allowed valence, none if the atom is over-bonded
+    valence = np.zeros(n, dtype=np.int64)
+    for element, valence_list in ATOM_VALENCE.items():
+        mask = symbol == SYMBOL_INDEX[element]
+        for allowed in sorted(valence_list, reverse=True):
+            fill = mask & (explicit <= allowed)
+            valence[fill] = allowed - explicit[fill]
+    return {
+        'symbol': symbol,
+        'degree': degree,
+        'numhs': valence,
+        'valence': valence,
+        'aromatic': np.zeros(n, dtype=bool),
+        'bonds': bonds,
+        'orders': orders,
+    }
+
+def Subset_Graph(graph, index):
+    """
+    graph of a subset of the atoms, same as Template_Graph of their pdb lines when index keeps whole residues
+    :param graph: Template_Graph of all the atoms
+    :param index: sorted atom indices of the subset
+    :return:
+    Template_Graph dict of the subset, coords not included
+    """
+    position = np.full(len(graph['symbol']), -1, dtype=np.int64)
+    position[index] = np.arange(len(index))
+    bonds = position[graph['bonds']]
+    keep = (bonds >= 0).all(1)
+    return Bond_Properties(graph['symbol'][index], bonds[keep], graph['orders'][keep])
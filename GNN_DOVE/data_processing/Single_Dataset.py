@@ -36,15 +36,22 @@ from torch.utils.data import Dataset
 import numpy as np
 import torch
 import os
+from ops.Stage_Profiler import Profile_Stage
 
 class Single_Dataset(Dataset):
 
     def __init__(self,file_list):
+        """
+        :param file_list: list of Input.npz paths, or of samples already prepared in memory
+        """
         self.listfiles=file_list
 
     def __getitem__(self, idx):
         file_path=self.listfiles[idx]
-        data=np.load(file_path)
+        if isinstance(file_path,dict):
+            return file_path
+        with Profile_Stage("load",file_path):
+            data=np.load(file_path)
         # H=data['H']
         # A1=data['A1']
         # A2 = data['A2']
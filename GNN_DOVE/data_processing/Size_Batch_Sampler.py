@@ -0,0 +1,83 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import numpy as np
+from torch.utils.data import Sampler
+
+#measured peak memory of collate and a dense forward pass per padded atom pair (float32 A1, A2 and the attention tensors)
+ATOM2_BYTES=64
+
+def Batch_Budget(params):
+    """
+    :param params: max_atoms2, and memory_budget (MB) converted with ATOM2_BYTES, 0 to disable each
+    :return:
+    budget of len(batch)*max_natoms^2, the tighter of the two, 0 for no budget
+    """
+    budgets=[]
+    if params.get('max_atoms2',0)>0:
+        budgets.append(params['max_atoms2'])
+    if params.get('memory_budget',0)>0:
+        budgets.append(int(params['memory_budget']*1024*1024/ATOM2_BYTES))
+    return min(budgets) if budgets else 0
+
+class Size_Batch_Sampler(Sampler):
+    """
+    batch sampler grouping graphs of similar atom numbers, so that collate_fn pads each batch as little as possible.
+    a batch is closed when it has batch_size graphs or when batch_size*max_natoms^2 would exceed max_atoms2,
+    the sum of the padded natoms^2 of the batch.
+    """
+    def __init__(self,atom_numbers,batch_size,max_atoms2=0):
+        """
+        :param atom_numbers: number of atoms of each graph in the dataset
+        :param batch_size: maximum number of graphs in one batch, 0 to batch by max_atoms2 only
+        :param max_atoms2: budget of len(batch)*max_natoms^2 for one batch, 0 for no budget
+        """
+        self.batches=[]
+        order=np.argsort(np.asarray(atom_numbers),kind='stable')
+        current=[]
+        for index in order:
+            natom=int(atom_numbers[index])#ascending order, the new graph is always the largest
+            if len(current)>0 and ((batch_size>0 and len(current)>=batch_size) or
+                                   (max_atoms2>0 and (len(current)+1)*natom**2>max_atoms2)):
+                self.batches.append(current)
+                current=[]
+            current.append(int(index))
+        if len(current)>0:
+            self.batches.append(current)
+
+    def __iter__(self):
+        return iter(self.batches)
+
+    def __len__(self):
+        return len(self.batches)
@@ -59,4 +59,38 @@ def collate_fn(batch):
     V = torch.from_numpy(V).float()
     Atoms_Number=torch.Tensor(Atoms_Number)
 
-    return H, A1, A2, V,Atoms_Number #, keys
\ No newline at end of file
+    return H, A1, A2, V,Atoms_Number #, keys
+
+def sparse_collate_fn(batch):
+    """
+    concatenate sparse graphs without padding, A1/A2 become block diagonal sparse tensors
+    :param batch: list of samples saved with sparse edge lists
+    :return:
+    """
+    H = []
+    V = []
+    A1_index = []
+    A1_value = []
+    A2_index = []
+    A2_value = []
+    Atoms_Number = []
+    offset = 0
+    for i in range(len(batch)):
+        natom = len(batch[i]['H'])
+        H.append(batch[i]['H'])
+        V.append(batch[i]['V'])
+        A1_index.append(batch[i]['A1_index'] + offset)
+        A1_value.append(batch[i]['A1_value'])
+        A2_index.append(batch[i]['A2_index'] + offset)
+        A2_value.append(batch[i]['A2_value'])
+        Atoms_Number.append(natom)
+        offset += natom
+    H = torch.from_numpy(np.concatenate(H, 0)).float()
+    V = torch.from_numpy(np.concatenate(V, 0)).float()
+    A1 = torch.sparse_coo_tensor(torch.from_numpy(np.concatenate(A1_index, 1)).long(),
+                                 torch.from_numpy(np.concatenate(A1_value, 0)).float(), (offset, offset)).coalesce()
+    A2 = torch.sparse_coo_tensor(torch.from_numpy(np.concatenate(A2_index, 1)).long(),
+                                 torch.from_numpy(np.concatenate(A2_value, 0)).float(), (offset, offset)).coalesce()
+    Atoms_Number = torch.Tensor(Atoms_Number)
+
+    return H, A1, A2, V, Atoms_Number
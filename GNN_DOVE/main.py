@@ -58,5 +58,23 @@ if __name__ == "__main__":
         from predict.visualize_attention import visualize_attention
         visualize_attention(input_path, params)
 
+    elif params['mode']==3:
+        work_path = os.path.abspath(params['F'])  # directory for saved inputs
+        os.environ['CUDA_VISIBLE_DEVICES'] = params['gpu']
+        from predict.score_server import score_server
+        score_server(work_path, params)
+
+    elif params['mode']==4:
+        input_path = os.path.abspath(params['F'])  # one pdb file used to trace the model
+        os.environ['CUDA_VISIBLE_DEVICES'] = params['gpu']
+        from predict.export_model import export_model
+        export_model(input_path, params)
+
+    elif params['mode']==5:
+        input_path = os.path.abspath(params['F'])  # reference decoy directory
+        os.environ['CUDA_VISIBLE_DEVICES'] = params['gpu']
+        from predict.quantize_report import quantize_report
+        quantize_report(input_path, params)
+
 
 
@@ -0,0 +1,66 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import torch
+import torch.nn as nn
+
+
+class Ensemble_Model(nn.Module):
+    """
+    evaluates several fold models on the same batch, so that each batch is collated and moved to device only once
+    """
+    def __init__(self, model_list):
+        super(Ensemble_Model, self).__init__()
+        self.models = nn.ModuleList(model_list)
+
+    def test_model_folds(self, data, device):
+        """
+        :param data: collated batch
+        :param device: model device
+        :return: batch_size*num_folds scores
+        """
+        fold_pred = [model.test_model(data, device) for model in self.models]
+        return torch.stack(fold_pred, 1)
+
+    def test_model(self, data, device):
+        return self.test_model_folds(data, device).mean(1)
+
+    def eval_model_attention(self, data, device):
+        """
+        :return: attention of the first GAT layer with/without intermolecular edges, averaged over the folds
+        """
+        attention = [model.eval_model_attention(data, device) for model in self.models]
+        attention1 = sum(item[0] for item in attention) / len(attention)
+        attention2 = sum(item[1] for item in attention) / len(attention)
+        return attention1, attention2
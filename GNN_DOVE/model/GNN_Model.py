@@ -61,7 +61,7 @@ class GNN_Model(nn.Module):
 
         self.layers1 = [d_graph_layer for i in range(n_graph_layer +1)]
         self.gconv1 = nn.ModuleList \
-            ([GAT_gate(self.layers1[i], self.layers1[ i +1]) for i in range(len(self.layers1 ) -1)])
+            ([GAT_gate(self.layers1[i], self.layers1[ i +1], params['neighbor_attention']) for i in range(len(self.layers1 ) -1)])
 
         self.FC = nn.ModuleList([nn.Linear(self.layers1[-1], d_FC_layer) if i== 0 else
                                  nn.Linear(d_FC_layer, 1) if i == n_FC_layer - 1 else
@@ -90,16 +90,35 @@ class GNN_Model(nn.Module):
 
         return c_hs
     def Formulate_Adj2(self,c_adjs2,c_valid,atom_list,device):
+        if c_adjs2.is_sparse:
+            return self.Formulate_Sparse_Adj2(c_adjs2,c_valid)
         study_distance = c_adjs2.clone().detach().to(device)  # only focused on where there exist atoms, ignore the area filled with 0
         study_distance = torch.exp(-torch.pow(study_distance - self.mu.expand_as(study_distance), 2) / self.dev)
-        filled_value = torch.Tensor([0]).expand_as(study_distance).to(device)
-        for batch_idx in range(len(c_adjs2)):
-            num_atoms = int(atom_list[batch_idx])
-            count_receptor = len(c_valid[batch_idx].nonzero(as_tuple=False))
-            c_adjs2[batch_idx,:count_receptor,count_receptor:num_atoms]=torch.where(c_adjs2[batch_idx,:count_receptor,count_receptor:num_atoms]<=10,study_distance[batch_idx,:count_receptor,count_receptor:num_atoms],filled_value[batch_idx,:count_receptor,count_receptor:num_atoms])
-            c_adjs2[batch_idx,count_receptor:num_atoms,:count_receptor]=c_adjs2[batch_idx,:count_receptor,count_receptor:num_atoms].t()
-        return c_adjs2
-
+        # receptor atoms are [0,count_receptor), ligand atoms are [count_receptor,num_atoms), the rest is padding
+        atom_index = torch.arange(c_adjs2.size(1), device=c_adjs2.device)
+        count_receptor = c_valid.sum(1, keepdim=True).to(c_adjs2.device)
+        num_atoms = atom_list.to(c_adjs2.device).unsqueeze(1)
+        receptor_mask = atom_index < count_receptor
+        ligand_mask = (atom_index >= count_receptor) & (atom_index < num_atoms)
+        cross_mask = (receptor_mask.unsqueeze(2) & ligand_mask.unsqueeze(1)) | (ligand_mask.unsqueeze(2) & receptor_mask.unsqueeze(1))
+        cross_value = torch.where(c_adjs2 <= 10, study_distance, torch.zeros_like(study_distance))
+        return torch.where(cross_mask, cross_value, c_adjs2)
+
+    def Formulate_Sparse_Adj2(self,c_adjs2,c_valid):
+        """
+        sparse version of Formulate_Adj2, edges between receptor and ligand carry distances
+        :param c_adjs2: sparse adjacency with covalent edges and receptor-ligand edges
+        :param c_valid: 1 for receptor atoms, 0 for ligand atoms
+        :return:
+        """
+        c_adjs2 = c_adjs2.coalesce()
+        index = c_adjs2.indices()
+        distance = c_adjs2.values()
+        cross = c_valid[index[0]] != c_valid[index[1]]
+        study_distance = torch.exp(-torch.pow(distance - self.mu, 2) / self.dev)
+        study_distance = torch.where(distance <= 10, study_distance, torch.zeros_like(study_distance))
+        value = torch.where(cross, study_distance, distance)
+        return torch.sparse_coo_tensor(index, value, c_adjs2.size())
     def get_attention_weight(self,data):
         c_hs, c_adjs1, c_adjs2 = data
         atten1,c_hs1 = self.gconv1[0](c_hs, c_adjs1,request_attention=True)  # filled 0 part will not effect other parts
@@ -122,15 +141,14 @@ class GNN_Model(nn.Module):
         #c_hs = c_hs.sum(1)
         return c_hs
     def Get_Prediction(self,c_hs,atom_list):
-        prediction=[]
-        for batch_idx in range(len(atom_list)):
-            num_atoms = int(atom_list[batch_idx])
-            tmp_pred=c_hs[batch_idx,:num_atoms]
-            tmp_pred=tmp_pred.sum(0)#sum all the used atoms
-            #if self.params['debug']:
-            #    print("pred feature size",tmp_pred.size())
-            prediction.append(tmp_pred)
-        prediction = torch.stack(prediction, 0)
+        if c_hs.dim()==2:
+            #sparse mode, atoms of all the graphs are concatenated
+            batch_index = torch.repeat_interleave(torch.arange(len(atom_list), device=c_hs.device),atom_list.long().to(c_hs.device))
+            prediction = torch.zeros(len(atom_list), c_hs.size(-1), dtype=c_hs.dtype, device=c_hs.device)
+            return prediction.index_add_(0, batch_index, c_hs)
+        atom_index = torch.arange(c_hs.size(1), device=c_hs.device)
+        atom_mask = atom_index < atom_list.to(c_hs.device).unsqueeze(1)#sum all the used atoms
+        prediction = (c_hs * atom_mask.unsqueeze(2).to(c_hs.dtype)).sum(1)
         return prediction
     def train_model(self,data,device):
         #get data
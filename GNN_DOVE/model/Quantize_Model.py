@@ -0,0 +1,79 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import copy
+import torch
+import torch.nn as nn
+from model.layers import GAT_gate
+from model.GNN_Model import GNN_Model
+
+
+class Graph_Linear(nn.Module):
+    """
+    applies a Linear layer to each graph of the batch separately, so that dynamic quantization picks the
+    activation range of every graph on its own and the scores do not depend on the other decoys of the batch
+    """
+    def __init__(self, linear, batch_dim):
+        """
+        :param linear: Linear layer
+        :param batch_dim: number of input dimensions of a batch of graphs, 3 for node features, 2 for graph features
+        """
+        super(Graph_Linear, self).__init__()
+        self.linear = linear
+        self.batch_dim = batch_dim
+
+    def forward(self, x):
+        if x.dim() != self.batch_dim:
+            #sparse mode concatenates the atoms of all the graphs, the range is shared by the batch
+            return self.linear(x)
+        return torch.cat([self.linear(x[k:k + 1]) for k in range(x.size(0))], 0)
+
+
+def Quantize_Model(model):
+    """
+    dynamic INT8 quantization of the Linear layers (embedding, GAT_gate W/gate, FC) and the GAT_gate A projections
+    :param model: fp32 GNN_Model or Ensemble_Model on cpu
+    :return:
+    quantized copy of the model
+    """
+    model = copy.deepcopy(model)
+    for module in list(model.modules()):
+        if isinstance(module, GAT_gate):
+            module.quantize_projection()
+            for name in ['W', 'gate', 'A_linear', 'A_sym_linear']:
+                setattr(module, name, Graph_Linear(getattr(module, name), 3))
+        elif isinstance(module, GNN_Model):
+            module.embede = Graph_Linear(module.embede, 3)
+            module.FC = nn.ModuleList([Graph_Linear(layer, 2) for layer in module.FC])
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
@@ -0,0 +1,84 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import torch
+import torch.nn as nn
+
+
+class Score_Module(nn.Module):
+    """
+    test_model of a GNN_Model or Ensemble_Model as a plain forward, so that it can be traced by torch.jit
+    """
+    def __init__(self, model):
+        super(Score_Module, self).__init__()
+        self.model = model
+
+    def forward(self, H, A1, A2, V, num_atoms):
+        return self.model.test_model((H, A1, A2, V, num_atoms), H.device)
+
+
+def Export_Script(model, data, export_path):
+    """
+    trace the dense test_model path and save it as a TorchScript artifact
+    :param model: GNN_Model or Ensemble_Model on cpu, with neighbor_attention disabled
+    :param data: example collated dense batch (H, A1, A2, V, num_atoms)
+    :param export_path: path of the saved artifact
+    :return:
+    traced module
+    """
+    with torch.no_grad():
+        script = torch.jit.trace(Score_Module(model).eval(), tuple(data), check_trace=False)
+    if hasattr(torch.jit, "freeze"):
+        #inline the weights as constants so that the graph can be fused
+        script = torch.jit.freeze(script)
+    torch.jit.save(script, export_path)
+    return script
+
+
+class Script_Model(object):
+    """
+    TorchScript artifact with the test_model interface of GNN_Model, for scoring without the python model code
+    """
+    def __init__(self, export_path, device):
+        self.script = torch.jit.load(export_path, map_location=device)
+        self.script.eval()
+
+    def test_model(self, data, device):
+        H, A1, A2, V, num_atoms = data
+        if A1.is_sparse:
+            raise ValueError("TorchScript engine only supports dense inputs, run with --sparse=0")
+        return self.script(H, A1, A2, V, num_atoms)
+
+    def eval_model_attention(self, data, device):
+        raise ValueError("attention is not available with --engine=torchscript, run with --engine=eager")
@@ -36,21 +36,74 @@ import torch
 import torch.nn.functional as F
 import torch.nn as nn
 
+def segment_softmax(score, index, num_segments):
+    """
+    softmax of score over the entries sharing the same index
+    :param score: edge scores
+    :param index: segment id of each edge
+    :param num_segments: number of segments
+    :return:
+    normalized score, same order as the input
+    """
+    #scatter the scores into a num_segments*max_degree table, so that it works without scatter_reduce
+    order = torch.argsort(index)
+    sorted_index = index[order]
+    count = torch.bincount(sorted_index, minlength=num_segments)
+    start = torch.cumsum(count, 0) - count
+    position = torch.arange(len(sorted_index), device=score.device) - start[sorted_index]
+    max_degree = int(count.max()) if len(count) > 0 else 0
+    table = torch.full((num_segments, max(max_degree, 1)), float('-inf'), dtype=score.dtype, device=score.device)
+    table[sorted_index, position] = score[order]
+    table = F.softmax(table, dim=1)
+    normalized = torch.empty_like(score)
+    normalized[order] = table[sorted_index, position]
+    return normalized
+
 
 class GAT_gate(nn.Module):
-    def __init__(self, n_in_feature, n_out_feature):
+    def __init__(self, n_in_feature, n_out_feature, neighbor_attention=False):
+        """
+        :param neighbor_attention: for dense adj, compute attention only over the neighbor list of each atom
+        """
         super(GAT_gate, self).__init__()
+        self.neighbor_attention = neighbor_attention
         self.W = nn.Linear(n_in_feature, n_out_feature)
         # self.A = nn.Parameter(torch.Tensor(n_out_feature, n_out_feature))
         self.A = nn.Parameter(torch.zeros(size=(n_out_feature, n_out_feature)))
         self.gate = nn.Linear(n_out_feature * 2, 1)#default bias=True
         self.leakyrelu = nn.LeakyReLU(0.2)
+        # Linear copies of the A projections, only created by quantize_projection
+        self.A_linear = None
+        self.A_sym_linear = None
+
+    def quantize_projection(self):
+        """
+        copy h*A and h*(A+A^T) into Linear layers, so that dynamic quantization also covers the attention projection
+        """
+        n_feature = self.A.size(0)
+        self.A_linear = nn.Linear(n_feature, n_feature, bias=False)
+        self.A_sym_linear = nn.Linear(n_feature, n_feature, bias=False)
+        with torch.no_grad():
+            self.A_linear.weight.copy_(self.A.t())#Linear computes h*W^T
+            self.A_sym_linear.weight.copy_(self.A + self.A.t())
+
+    def project(self, h, symmetric=False):
+        """
+        :return: h*A, or h*(A+A^T) if symmetric
+        """
+        if self.A_linear is not None:
+            return self.A_sym_linear(h) if symmetric else self.A_linear(h)
+        return torch.matmul(h, self.A + self.A.t() if symmetric else self.A)
 
     def forward(self, x, adj,request_attention=False):
+        if adj.is_sparse:
+            return self.forward_sparse(x, adj, request_attention)
+        if self.neighbor_attention:
+            return self.forward_neighbor(x, adj, request_attention)
         h = self.W(x)#x'=W*x_in
         batch_size = h.size()[0]
         N = h.size()[1]#num_atoms
-        e = torch.einsum('ijl,ikl->ijk', (torch.matmul(h, self.A), h))#A is E in the paper,
+        e = torch.einsum('ijl,ikl->ijk', (self.project(h), h))#A is E in the paper,
         #This function provides a way of computing multilinear expressions (i.e. sums of products) using the Einstein summation convention.
         e = e + e.permute((0, 2, 1))
         zero_vec = -9e15 * torch.ones_like(e)
@@ -68,6 +121,74 @@ class GAT_gate(nn.Module):
             return output_attention,retval
         else:
             return retval
+    def forward_sparse(self, x, adj, request_attention=False):
+        """
+        same as forward, but only computes attention over the edges of a sparse adj
+        :param x: num_atoms*n_in_feature node features of all the graphs in the batch
+        :param adj: num_atoms*num_atoms sparse coo adjacency
+        :param request_attention: return attention as a sparse tensor or not
+        :return:
+        """
+        N = x.size()[0]
+        adj = adj.coalesce()
+        index = adj.indices()
+        value = adj.values()
+        keep = value > 0#same as adj>0 in the dense mode
+        index = index[:, keep]
+        value = value[keep]
+        output_attention, retval = self.propagate(x, index[0], index[1], value)
+        if request_attention:
+            return torch.sparse_coo_tensor(index, output_attention, (N, N)), retval
+        else:
+            return retval
+    def forward_neighbor(self, x, adj, request_attention=False):
+        """
+        same as forward, but only computes attention over the neighbor list (adj>0) of each atom
+        :param x: batch_size*num_atoms*n_in_feature node features
+        :param adj: batch_size*num_atoms*num_atoms dense adjacency
+        :param request_attention: return attention as a dense tensor or not
+        :return:
+        """
+        N = adj.size()[1]
+        batch, row, col = torch.nonzero(adj > 0, as_tuple=True)
+        value = adj[batch, row, col]
+        #graphs of the batch become one disconnected graph of batch_size*N atoms
+        output_attention, retval = self.propagate(x, batch * N + row, batch * N + col, value)
+        if request_attention:
+            attention = torch.zeros_like(adj)
+            attention[batch, row, col] = output_attention
+            return attention, retval
+        else:
+            return retval
+    def propagate(self, x, row, col, value):
+        """
+        gated attention over an edge list
+        :param x: num_atoms*n_in_feature node features, or batch_size*num_atoms*n_in_feature with the atoms
+        of the batch indexed in order by row and col
+        :param row: receiving atom of each edge
+        :param col: sending atom of each edge
+        :param value: adjacency value of each edge
+        :return:
+        attention of each edge, updated node features with the shape of x
+        """
+        h = self.W(x)
+        #e+e^T of the dense mode, h_i A h_j + h_j A h_i = h_i (A+A^T) h_j needs a single gathered product per edge
+        hA = self.project(h, symmetric=True)
+        shape = h.size()
+        h = h.reshape(-1, shape[-1])
+        hA = hA.reshape(-1, shape[-1])
+        N = h.size()[0]
+        e = (hA[row] * h[col]).sum(-1)
+        attention = segment_softmax(e, col, N)#dense softmax over dim=1 normalizes each column
+        output_attention = attention
+        attention = attention * value
+        #sparse matrix product instead of materializing one message per edge
+        h_prime = torch.sparse.mm(torch.sparse_coo_tensor(torch.stack([row, col], 0), attention, (N, N)), h)
+        h_prime = F.relu(h_prime).reshape(shape)
+
+        coeff = torch.sigmoid(self.gate(torch.cat([x, h_prime], -1)))
+        retval = coeff * x + (1 - coeff) * h_prime
+        return output_attention, retval
     def forward_single(self, x, adj):
         h = self.W(x)#x'=W*x_in
         #batch_size = h.size()[0]
@@ -0,0 +1,181 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import csv
+import json
+import time
+import resource
+from contextlib import contextmanager
+from collections import OrderedDict
+
+#profile directory of the run, set in the environment so that spawned workers profile as well
+PROFILE_ENV = "GNN_DOVE_PROFILE"
+#stages in pipeline order, for the summary
+STAGES = ["dedup", "interface", "parse", "featurize", "npz write", "load", "collate", "forward"]
+#rss_delta: change of the current rss over the block, peak_growth: rise of the process peak rss during the block (MB)
+FIELDS = ["pid", "name", "stage", "wall", "cpu", "rss_delta", "peak_growth"]
+
+class Stage_Profiler(object):
+    def __init__(self,profile_dir):
+        """
+        append the records of this process to profile_dir/stages_[pid].csv
+        :param profile_dir: directory of the profile report
+        """
+        self.profile_dir=profile_dir
+        self.pid=os.getpid()
+        #line buffered, pool workers may exit without closing the file
+        self.file=open(os.path.join(profile_dir,"stages_%d.csv"%self.pid),'a',buffering=1,newline='')
+        self.writer=csv.writer(self.file,lineterminator='\n')
+
+    @contextmanager
+    def Stage(self,stage,name):
+        """
+        record wall time, cpu time, rss change and peak rss growth of the enclosed block
+        :param stage: stage name, one of STAGES
+        :param name: decoy path, or batch description for collate and forward
+        """
+        wall=time.perf_counter()
+        cpu=time.process_time()
+        rss=Current_RSS()
+        peak=Peak_RSS()
+        try:
+            yield
+        finally:
+            wall=time.perf_counter()-wall
+            cpu=time.process_time()-cpu
+            self.writer.writerow([self.pid,name,stage,"%.6f"%wall,"%.6f"%cpu,"%.1f"%(Current_RSS()-rss),"%.1f"%(Peak_RSS()-peak)])
+
+PROFILER={}
+
+def Peak_RSS():
+    #peak resident set size of this process since it started (MB), ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0
+
+def Current_RSS():
+    #current resident set size of this process (MB), 0 where /proc is not available
+    try:
+        with open("/proc/self/statm",'r') as file:
+            return int(file.read().split()[1])*resource.getpagesize()/1024.0/1024.0
+    except (OSError,ValueError,IndexError):
+        return 0.0
+
+def Get_Profiler():
+    """
+    :return:
+    Stage_Profiler of this process, None when profiling is disabled
+    """
+    profile_dir=os.environ.get(PROFILE_ENV,'')
+    if not profile_dir:
+        return None
+    key=(os.getpid(),profile_dir)
+    if key not in PROFILER:
+        PROFILER[key]=Stage_Profiler(profile_dir)
+    return PROFILER[key]
+
+@contextmanager
+def Profile_Stage(stage,name):
+    """
+    same as Stage_Profiler.Stage, does nothing when profiling is disabled
+    """
+    profiler=Get_Profiler()
+    if profiler is None:
+        yield
+        return
+    with profiler.Stage(stage,name):
+        yield
+
+def Start_Profile(profile_dir):
+    """
+    enable profiling for this process and the workers it spawns later
+    :param profile_dir: directory of the profile report, records of earlier runs are removed
+    """
+    profile_dir=os.path.abspath(profile_dir)
+    os.makedirs(profile_dir,exist_ok=True)
+    for item in os.listdir(profile_dir):
+        if item.startswith("stages_") and item.endswith(".csv"):
+            os.remove(os.path.join(profile_dir,item))
+    os.environ[PROFILE_ENV]=profile_dir
+
+def Summarize_Profile(records):
+    """
+    :param records: list of record dicts
+    :return:
+    dict of stage to count, total and mean wall time, total cpu time, largest rss change and largest peak rss growth of one block
+    """
+    summary=OrderedDict()
+    for stage in STAGES+sorted(set(record['stage'] for record in records)-set(STAGES)):
+        stage_records=[record for record in records if record['stage']==stage]
+        if len(stage_records)==0:
+            continue
+        wall=sum(record['wall'] for record in stage_records)
+        summary[stage]={'count':len(stage_records),'wall':wall,'mean_wall':wall/len(stage_records),
+                        'cpu':sum(record['cpu'] for record in stage_records),
+                        'rss_delta':max(record['rss_delta'] for record in stage_records),
+                        'peak_growth':max(record['peak_growth'] for record in stage_records)}
+    return summary
+
+def Write_Profile_Report(profile_dir=None):
+    """
+    merge the records of all processes into profile.csv, profile.json and summary.txt
+    :param profile_dir: directory of the profile report, None for the one of Start_Profile
+    :return:
+    summary of Summarize_Profile
+    """
+    profile_dir=profile_dir or os.environ.get(PROFILE_ENV,'')
+    records=[]
+    for item in sorted(os.listdir(profile_dir)):
+        if not (item.startswith("stages_") and item.endswith(".csv")):
+            continue
+        with open(os.path.join(profile_dir,item),'r') as file:
+            for row in csv.reader(file):
+                if len(row)!=len(FIELDS):
+                    continue#cut line of a killed worker
+                records.append({'pid':int(row[0]),'name':row[1],'stage':row[2],'wall':float(row[3]),
+                                'cpu':float(row[4]),'rss_delta':float(row[5]),'peak_growth':float(row[6])})
+    summary=Summarize_Profile(records)
+    with open(os.path.join(profile_dir,"profile.csv"),'w',newline='') as file:
+        writer=csv.DictWriter(file,fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+    with open(os.path.join(profile_dir,"profile.json"),'w') as file:
+        json.dump({'summary':summary,'records':records},file,indent=1)
+    lines=["%-10s %8s %10s %10s %10s %14s %16s"%("Stage","Count","Wall(s)","Mean(ms)","CPU(s)","MaxRSSDelta(MB)","MaxPeakGrowth(MB)")]
+    for stage,item in summary.items():
+        lines.append("%-10s %8d %10.3f %10.2f %10.3f %14.1f %16.1f"%(stage,item['count'],item['wall'],item['mean_wall']*1000,item['cpu'],
+                                                               item['rss_delta'],item['peak_growth']))
+    with open(os.path.join(profile_dir,"summary.txt"),'w') as file:
+        file.write("\n".join(lines)+"\n")
+    print("\n".join(lines))
+    return summary
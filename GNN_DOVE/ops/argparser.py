@@ -38,10 +38,17 @@ import argparse
 def argparser():
     parser = argparse.ArgumentParser()
     parser.add_argument('-F',type=str, required=True,help='decoy example path')#File path for decoy dir
-    parser.add_argument('--mode',type=int,required=True,help='0: predicting for single docking model 1: predicting and sorting for a list of docking models')
+    parser.add_argument('--mode',type=int,required=True,help='0: predicting for single docking model 1: predicting and sorting for a list of docking models 3: scoring server 4: export TorchScript model 5: INT8 quantization drift report')
     parser.add_argument('--gpu',type=str,default='0',help='Choose gpu id, example: \'1,2\'(specify use gpu 1 and 2)')
     parser.add_argument("--batch_size", help="batch_size", type=int, default=32)
-    parser.add_argument("--num_workers", help="number of workers", type=int, default=4)
+    parser.add_argument("--max_atoms2", help="budget of batch_size*max_atoms^2 for one batch, 0 for no budget", type=int, default=0)
+    parser.add_argument("--memory_budget", help="memory budget (MB) of one batch, converted to a max_atoms2 budget, 0 for no budget", type=int, default=0)
+    parser.add_argument("--bucket_window", help="number of prepared decoys sorted by size before batching", type=int, default=256)
+    parser.add_argument("--num_workers", help="number of DataLoader workers of modes 0 and 2, mode 1 batches in process and ignores it (see --prepare_workers)", type=int, default=4)
+    parser.add_argument("--prepare_workers", help="number of processes for input preparation", type=int, default=4)
+    parser.add_argument("--queue_size", help="number of decoys queued for input preparation beyond the next bucket window, which mode 1 prepares while the current window is scored", type=int, default=64)
+    parser.add_argument("--cpu_workers", help="number of cpu processes scoring shards of the decoys in mode 1, each with its own model, 0 to score in one process", type=int, default=0)
+    parser.add_argument("--cpu_threads", help="torch threads (and pinned cores) of each cpu worker, 0 to share the cores evenly", type=int, default=0)
     parser.add_argument("--n_graph_layer", help="number of GNN layer", type=int, default=4)
     parser.add_argument("--d_graph_layer", help="dimension of GNN layer", type=int, default=140)
     parser.add_argument("--n_FC_layer", help="number of FC layer", type=int, default=4)
@@ -50,6 +57,31 @@ def argparser():
     parser.add_argument("--initial_dev", help="initial value of dev", type=float, default=1.0)
     parser.add_argument("--dropout_rate", help="dropout_rate", type=float, default=0.3)
     parser.add_argument('--seed',type=int,default=888,help='random seed for shuffling')
+    parser.add_argument('--sparse',type=int,default=0,help='1: use sparse edge lists for A1/A2 instead of dense matrices')
+    parser.add_argument('--neighbor_attention',type=int,default=0,help='1: compute attention only over the neighbors of each atom instead of all atom pairs')
+    parser.add_argument('--quantize',type=int,default=0,help='1: score with dynamic INT8 quantized Linear layers on cpu')
+    parser.add_argument('--engine',type=str,default='eager',choices=['eager','torchscript'],help='eager: run the python model, torchscript: run the cpu artifact exported by mode 4 (dense inputs only)')
+    parser.add_argument('--engine_path',type=str,default='',help='path of the TorchScript artifact, empty for best_model/script_fold[fold].pt')
+    parser.add_argument('--resume',type=int,default=0,help='1: mode 1 skips the decoys already scored in Predict_journal.txt of an interrupted run')
+    parser.add_argument('--receptor',type=str,default='',help='receptor pdb of a MEGADOCK .out given to mode 1, empty for the one in the .out header')
+    parser.add_argument('--ligand',type=str,default='',help='ligand pdb of a MEGADOCK .out given to mode 1, empty for the one in the .out header')
+    parser.add_argument('--num_poses',type=int,default=0,help='number of top MEGADOCK poses to score, 0 for all of them')
+    parser.add_argument('--reuse_graphs',type=int,default=0,help='1: rigid-body decoys of one docking run, build the receptor and ligand graphs once and only recompute the interface of each decoy')
+    parser.add_argument('--dedup_grid',type=float,default=0,help='mode 1 scores one decoy per group of decoys whose CA atoms all lie within this distance (angstrom), 0 to disable')
+    parser.add_argument('--top_k',type=int,default=0,help='mode 1 keeps Predict_top.txt with the best top_k decoys so far, updated as batches finish, 0 to disable')
+    parser.add_argument('--output_format',type=str,default='',help='comma separated list of csv, json and parquet: mode 1 also writes the ranked scores with the score of each fold model')
+    parser.add_argument('--min_residues',type=int,default=0,help='pre-filter: mode 1 ranks decoys with fewer interface residues last without scoring them, 0 to disable')
+    parser.add_argument('--min_contacts',type=int,default=0,help='pre-filter: minimum receptor-ligand atom pairs within 5A, 0 to disable')
+    parser.add_argument('--max_clashes',type=int,default=-1,help='pre-filter: maximum receptor-ligand atom pairs within 3A, -1 to disable')
+    parser.add_argument('--profile',type=int,default=0,help='1: record wall time, cpu time and peak memory of every stage and decoy in the Profile directory of the results')
+    parser.add_argument('--save_input',type=int,default=0,help='1: keep Input.pdb, interface files and Input.npz of each decoy for debugging')
+    parser.add_argument('--cache_dir',type=str,default='',help='directory of the feature cache, empty to disable caching')
+    parser.add_argument('--cache_size',type=int,default=10240,help='size limit of the feature cache (MB)')
+    parser.add_argument('--feature_store',type=str,default='',help='directory of the sharded feature store for mode 1, empty to disable')
+    parser.add_argument('--shard_size',type=int,default=1024,help='size of one feature store shard (MB)')
+    parser.add_argument('--host',type=str,default='127.0.0.1',help='address of the scoring server')
+    parser.add_argument('--port',type=int,default=8890,help='port of the scoring server')
+    parser.add_argument('--batch_wait',type=float,default=10,help='milliseconds the scoring server waits to fill a batch')
     parser.add_argument('--fold',required=True,help='specify fold model for prediction',type=int,default=-1)
     args = parser.parse_args()
     params = vars(args)
@@ -0,0 +1,138 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import torch
+from data_processing.Prepare_Input import Prepare_Sample,Prefilter_Thresholds,FILTER_STAGES
+from data_processing.Feature_Cache import Feature_Cache
+from data_processing.collate_fn import collate_fn,sparse_collate_fn
+
+#state of a cpu worker process, set by Init_Worker
+WORKER = {}
+
+def Core_Blocks(num_workers,num_threads=0):
+    """
+    split the cores available to this process into one block per worker
+    :param num_workers: number of worker processes
+    :param num_threads: cores of each worker, 0 to share all the cores evenly
+    :return:
+    list of core id lists
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    if num_threads <= 0:
+        num_threads = max(1, len(cores) // num_workers)
+    #wrap around when more threads are requested than there are cores
+    return [[cores[(k * num_threads + i) % len(cores)] for i in range(num_threads)] for k in range(num_workers)]
+
+def Init_Worker(params,core_queue):
+    """
+    pin the worker to its cores, limit torch threads to them and load its own copy of the model
+    """
+    os.environ['CUDA_VISIBLE_DEVICES'] = ''
+    cores = core_queue.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    from predict.predict_single_input import Load_Model
+    WORKER['model'], WORKER['device'] = Load_Model(params)
+    WORKER['params'] = params
+    WORKER['cache'] = Feature_Cache(params['cache_dir'], params['cache_size']) if params['cache_dir'] else None
+
+def Predict_Shard(structure_list):
+    """
+    prepare and score a shard of decoys in a worker process
+    :param structure_list: docking model paths or PDB_Model
+    :return:
+    list of scores, same order as structure_list, list of decoys dropped per pre-filter stage,
+    and fold scores of each decoy (None without --output_format)
+    """
+    from predict.predict_multi_input import Predict_Window
+    params = WORKER['params']
+    prefilter = Prefilter_Thresholds(params)
+    samples = [Prepare_Sample(structure_path, params['sparse'], WORKER['cache'], params['save_input'], prefilter, params['reuse_graphs'])
+               for structure_path in structure_list]
+    collate = sparse_collate_fn if params['sparse'] else collate_fn
+    filter_count = [0] * len(FILTER_STAGES)
+    fold_pred = [] if params['output_format'] else None
+    with torch.no_grad():
+        shard_pred = Predict_Window(samples, WORKER['device'], WORKER['model'], collate, params, filter_count, fold_pred)
+    return shard_pred, filter_count, fold_pred
+
+def CPU_Predict(Study_Name,Structure_List,params,journal=None,filter_count=None):
+    """
+    score decoys on params['cpu_workers'] processes, each with its own model, cores and torch threads
+    :param Study_Name: decoy names
+    :param Structure_List: iterable of docking model paths or PDB_Model, same order as Study_Name
+    :param params: cpu_workers, cpu_threads and bucket_window set the sharding, the rest is passed to Load_Model
+    :param journal: Score_Journal recording the scores of every shard, None to disable
+    :param filter_count: list of decoys dropped per pre-filter stage, incremented in place, None to skip
+    :return:
+    list of scores, same order as Study_Name
+    """
+    num_workers = params['cpu_workers']
+    context = get_context("spawn")
+    core_queue = context.Queue()
+    for cores in Core_Blocks(num_workers, params['cpu_threads']):
+        core_queue.put(cores)
+    #shards of one window, so that workers take new shards as they finish and stay balanced
+    shard_size = max(1, min(max(params['bucket_window'], params['batch_size']), -(-len(Study_Name) // num_workers)))
+    Final_Pred = []
+    structure_iter = iter(Structure_List)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                             initializer=Init_Worker, initargs=(params, core_queue)) as executor:
+        while True:
+            #two shards per worker in flight, so that streamed models are not all read into memory
+            while len(pending) < 2 * num_workers:
+                shard = list(islice(structure_iter, shard_size))
+                if len(shard) == 0:
+                    break
+                pending.append(executor.submit(Predict_Shard, shard))
+            if len(pending) == 0:
+                break
+            Shard_Pred, Shard_Count, Shard_Fold = pending.popleft().result()
+            if filter_count is not None:
+                for stage, count in enumerate(Shard_Count):
+                    filter_count[stage] += count
+            if journal is not None:
+                journal.Record(Study_Name[len(Final_Pred):len(Final_Pred) + len(Shard_Pred)], Shard_Pred, Shard_Fold)
+            Final_Pred += Shard_Pred
+    return Final_Pred
@@ -0,0 +1,58 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import torch
+from data_processing.Prepare_Input import Prepare_Sample
+from data_processing.collate_fn import collate_fn
+from model.Script_Model import Export_Script
+from predict.predict_single_input import Load_Model,Script_Path
+
+def export_model(input_path,params):
+    """
+    trace the model of params['fold'] on one docking model and save it as a TorchScript artifact for --engine=torchscript
+    :param input_path: docking model used as the tracing example
+    :param params: fold and model parameters, engine_path for the output path
+    :return:
+    """
+    #the artifact covers the dense fp32 path, neighbor attention and per-graph quantization have
+    #data dependent shapes or loops that tracing would fix
+    params=dict(params,engine='eager',neighbor_attention=0,quantize=0)
+    model,device=Load_Model(params)
+    model=model.cpu()
+    data=collate_fn([Prepare_Sample(input_path)])
+    export_path=Script_Path(params)
+    script=Export_Script(model,data,export_path)
+    with torch.no_grad():
+        difference=(script(*data)-model.test_model(data,torch.device("cpu"))).abs().max().item()
+    print("TorchScript model saved to %s, max difference to the python model on %s: %.6f"%(export_path,input_path,difference))
@@ -32,19 +32,264 @@
 
 # along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
 import os
+import time
+from functools import partial
+from itertools import tee
 from ops.os_operation import mkdir
 import shutil
 import  numpy as np
-from data_processing.Prepare_Input import Prepare_Input
-from model.GNN_Model import GNN_Model
+from data_processing.Prepare_Input import Prepare_Input_Stream,Prefilter_Thresholds,Sample_Stage,FILTER_STAGES,FILTERED_SCORE
+from data_processing.Feature_Cache import Feature_Cache,Structure_Key
+from data_processing.Feature_Store import Feature_Store
+from data_processing.PDB_Reader import Model_Names,Read_Models,Named_Structures,PDB_Stem
+from data_processing.Megadock_Poses import Pose_Names,Read_Poses
+from data_processing.Decoy_Set import Dedup_Decoys
 import torch
-from ops.train_utils import count_parameters,initialize_model
-from data_processing.collate_fn import collate_fn
+from data_processing.collate_fn import collate_fn,sparse_collate_fn
 from data_processing.Single_Dataset import Single_Dataset
-from torch.utils.data import DataLoader
-from predict.predict_single_input import init_model,Get_Predictions
-
-
+from data_processing.Size_Batch_Sampler import Size_Batch_Sampler,Batch_Budget
+from predict.predict_single_input import Load_Model,Get_Predictions
+from predict.cpu_inference import CPU_Predict
+from predict.score_journal import Score_Journal
+from predict.rank_output import Top_K_Ranking,Output_Formats,Write_Ranked_Output
+from ops.Stage_Profiler import Profile_Stage,Start_Profile,Write_Profile_Report
+
+
+def Predict_Batch(samples,device,model,collate=collate_fn,fold_pred=None):
+    """
+    predict one batch of prepared inputs, splitting it in halves while it runs out of memory
+    :param samples: list of loaded inputs of the batch
+    :param device: model device
+    :param model: model or Ensemble_Model of fold models
+    :param collate: collate function matching the saved input format
+    :param fold_pred: list extended in place with the fold scores of the batch, None to skip
+    :return:
+    list of scores for the batch
+    """
+    try:
+        with Profile_Stage("collate","batch of %d"%len(samples)):
+            batch = [collate(samples)]
+        Batch_Fold = [] if fold_pred is not None else None
+        Batch_Pred = Get_Predictions(batch, device, model, Batch_Fold)
+    except (RuntimeError, MemoryError) as error:
+        if len(samples) == 1 or not Is_Out_Of_Memory(error):
+            raise
+    else:
+        #only extended once the whole batch is scored, a failed attempt leaves no partial fold scores
+        if fold_pred is not None:
+            fold_pred += Batch_Fold
+        return Batch_Pred
+    #retry outside of the except block, so that the tensors of the failed attempt are released
+    batch = None
+    if device.type == "cuda":
+        torch.cuda.empty_cache()
+    half = len(samples) // 2
+    print("Out of memory with a batch of %d, retrying as %d+%d" % (len(samples), half, len(samples) - half))
+    return (Predict_Batch(samples[:half], device, model, collate, fold_pred) +
+            Predict_Batch(samples[half:], device, model, collate, fold_pred))
+
+def Is_Out_Of_Memory(error):
+    #torch raises RuntimeError for failed cuda and cpu allocations, numpy raises MemoryError
+    message = str(error)
+    return isinstance(error, MemoryError) or "out of memory" in message or "can't allocate memory" in message
+
+def Predict_Window(file_list,device,model,collate,params,filter_count=None,fold_pred=None,batch_done=None):
+    """
+    predict a window of prepared inputs, batching inputs of similar atom numbers together
+    :param file_list: list of prepared samples or input files of the window
+    :param device: model device
+    :param model: model or Ensemble_Model of fold models
+    :param collate: collate function matching the saved input format
+    :param params: batch_size, max_atoms2 and memory_budget are used to build batches, pre-filter thresholds to drop decoys
+    :param filter_count: list of dropped decoys per stage of FILTER_STAGES, incremented in place, None to skip
+    :param fold_pred: list extended in place with the fold scores of each input, None for dropped decoys, None to skip
+    :param batch_done: called with the window indices and scores of every batch as soon as it is scored, None to skip
+    :return:
+    list of scores, same order as file_list, FILTERED_SCORE for dropped decoys
+    """
+    dataset = Single_Dataset(file_list)
+    samples = [dataset[k] for k in range(len(dataset))]
+    prefilter = Prefilter_Thresholds(params)
+    Window_Pred = np.full(len(file_list), FILTERED_SCORE)
+    keep = []
+    for k, sample in enumerate(samples):
+        stage = Sample_Stage(sample, prefilter)
+        if stage < 0:
+            keep.append(k)
+            continue
+        if FILTER_STAGES[stage] == "missing interface stats":
+            print("Warning: input %d of the window has no interface stats to pre-filter, it is ranked last" % k)
+        if filter_count is not None:
+            filter_count[stage] += 1
+    Window_Fold = [None] * len(file_list)
+    if len(keep) > 0:
+        atom_numbers = [len(samples[k]['V']) for k in keep]
+        sampler = Size_Batch_Sampler(atom_numbers, params['batch_size'], Batch_Budget(params))
+        for batch in sampler:
+            batch = [keep[k] for k in batch]
+            Batch_Fold = [] if fold_pred is not None else None
+            Window_Pred[batch] = Predict_Batch([samples[k] for k in batch], device, model, collate, Batch_Fold)
+            if batch_done is not None:
+                batch_done(batch, Window_Pred[batch])
+            if fold_pred is not None:
+                for k, folds in zip(batch, Batch_Fold):
+                    Window_Fold[k] = folds
+    if fold_pred is not None:
+        fold_pred += Window_Fold
+    return list(Window_Pred)
+
+def Window_Size(params):
+    #decoys scored together, sorted by size before batching
+    return max(params['bucket_window'],params['batch_size'])
+
+def Store_Keys(Study_Name,Structure_List,store,sparse):
+    """
+    :return: generator of name, structure and Structure_Key of each decoy, None keys without a store
+    """
+    for name,structure in zip(Study_Name,Structure_List):
+        yield name,structure,Structure_Key(structure,sparse,10) if store is not None else None
+
+def Store_Input_Stream(Study_Name,Structure_List,store,cache,params):
+    """
+    inputs of the decoys, loaded from the feature store when they are stored already, otherwise prepared and appended to it
+    :param Study_Name: decoy names, the keys of the store
+    :param Structure_List: iterable of docking model paths or PDB_Model, same order as Study_Name
+    :param store: Feature_Store, None to always prepare the inputs
+    :param cache: Feature_Cache, None to disable
+    :param params: prepare_workers, queue_size plus one window, sparse, save_input, pre-filter thresholds and reuse_graphs are used for preparation
+    :return:
+    generator of samples, in the same order as Study_Name
+    """
+    #lazy, so that streamed models are only read as the preparation queue has room,
+    #the structure of a stored decoy is dropped so that tee only buffers its name and key
+    #with the pre-filter, entries stored without the interface counts are prepared again
+    required=('stats',) if Prefilter_Thresholds(params) is not None else ()
+    Decoy_List=((name,None,key) if store is not None and store.Has(name,key,required) else (name,structure,key)
+                for name,structure,key in Store_Keys(Study_Name,Structure_List,store,params['sparse']))
+    Prepare_Side,Load_Side=tee(Decoy_List)
+    Prepare_List=(structure for name,structure,key in Prepare_Side if structure is not None)
+    #the decoys of the next window are submitted before the current one is scored, so the pool keeps preparing during inference
+    queue_size=params['queue_size']+Window_Size(params)
+    input_stream=Prepare_Input_Stream(Prepare_List,params['prepare_workers'],queue_size,params['sparse'],cache,params['save_input'],
+                                     Prefilter_Thresholds(params),params['reuse_graphs'])
+    for name,structure,key in Load_Side:
+        if structure is None:
+            with Profile_Stage("load",name):
+                sample=store.Load(name)
+            yield sample
+            continue
+        sample=next(input_stream)
+        #filtered decoys have no graphs to store, they are extracted again with other thresholds
+        if store is not None and 'H' in sample:
+            store.Append(name,sample,key)
+        yield sample
+    input_stream.close()
+    if store is not None:
+        store.Close()
+
+def Stream_Predict(Study_Name,Structure_List,params,journal=None,filter_count=None):
+    """
+    score decoys in this process, consuming inputs as soon as they are prepared
+    :param journal: Score_Journal recording the scores of every window, None to disable
+    :param filter_count: list of decoys dropped per pre-filter stage, incremented in place, None to skip
+    :return:
+    list of scores, same order as Study_Name
+    """
+    # fold scores are only kept for the csv/json/parquet outputs
+    keep_folds=bool(params['output_format'])
+    # loading the model
+    model, device = Load_Model(params)
+
+    Final_Pred=[]
+    window_list=[]
+    window_size=Window_Size(params)
+    cache=Feature_Cache(params['cache_dir'],params['cache_size']) if params['cache_dir'] else None
+    store=Feature_Store(params['feature_store'],params['shard_size'],params['sparse']) if params['feature_store'] else None
+    input_stream=Store_Input_Stream(Study_Name,Structure_List,store,cache,params)
+    collate=sparse_collate_fn if params['sparse'] else collate_fn
+    for k,sample in enumerate(input_stream):
+        window_list.append(sample)
+        if len(window_list)==window_size or k==len(Study_Name)-1:
+            Window_Fold=[] if keep_folds else None
+            Window_Name=Study_Name[len(Final_Pred):len(Final_Pred)+len(window_list)]
+            batch_done=None
+            if journal is not None and journal.ranking is not None:
+                # the live ranking is refreshed as every batch finishes, the journal adds the dropped decoys after the window
+                batch_done=lambda batch,scores,names=Window_Name: journal.ranking.Update([names[k] for k in batch],scores)
+            Window_Pred=Predict_Window(window_list, device, model, collate, params, filter_count, Window_Fold, batch_done)
+            if journal is not None:
+                journal.Record(Window_Name,Window_Pred,Window_Fold)
+            if store is not None:
+                #keep the stored inputs of the scored decoys even if the run is interrupted later
+                store.Write_Index()
+            Final_Pred+=Window_Pred
+            window_list=[]
+    if cache is not None:
+        cache.Evict()
+    return Final_Pred
+
+def Write_Filter_Report(report_path,filter_count,num_decoys,num_filtered):
+    """
+    print and write the number of decoys dropped at each pre-filter stage
+    :param filter_count: list of decoys dropped per stage of FILTER_STAGES in this run
+    :param num_decoys: number of decoys checked in this run
+    :param num_filtered: decoys ranked last in Predict.txt, including the ones of resumed runs
+    """
+    lines=["Stage\tDropped\tRemaining"]
+    remaining=num_decoys
+    for stage,count in zip(FILTER_STAGES,filter_count):
+        remaining-=count
+        lines.append("%s\t%d\t%d"%(stage,count,remaining))
+    lines.append("scored by the model\t-\t%d"%remaining)
+    lines.append("ranked last with score %.4f\t%d\t-"%(FILTERED_SCORE,num_filtered))
+    with open(report_path,'w') as file:
+        file.write("\n".join(lines)+"\n")
+    print("Pre-filter: "+", ".join("%d dropped at %s"%(count,stage) for stage,count in zip(FILTER_STAGES,filter_count))
+          +", %d/%d decoys scored by the model"%(remaining,num_decoys))
+
+def Write_Dedup_Report(report_path,Study_Name,Representative,dedup_time,decoy_time,upper_bound=False):
+    """
+    print the work saved by deduplication and write the duplicates with their representative
+    :param Representative: dict of decoy name to the scored decoy of its group
+    :param dedup_time: seconds spent hashing the decoys
+    :param decoy_time: seconds spent preparing and scoring one decoy in this run, to estimate the time saved
+    :param upper_bound: decoy_time includes process startup and model loading
+    """
+    duplicates=[name for name in Study_Name if Representative[name]!=name]
+    summary="Deduplication: %d decoys, %d scored, %d duplicates skipped (%.1f%%), hashing %.1fs, %s %.1fs of preparation and scoring saved%s"%(
+        len(Study_Name),len(Study_Name)-len(duplicates),len(duplicates),100.0*len(duplicates)/max(len(Study_Name),1),
+        dedup_time,"at most" if upper_bound else "about",decoy_time*len(duplicates),
+        " (upper bound, includes startup and model loading)" if upper_bound else "")
+    with open(report_path,'w') as file:
+        file.write("#"+summary+"\n")
+        file.write("Input\tRepresentative\n")
+        for name in duplicates:
+            file.write(name+"\t"+Representative[name]+"\n")
+    print(summary)
+
+def Decoy_Files(input_path,save_path,save_input=False):
+    """
+    :param input_path: directory of single-model pdb files
+    :param save_path: result directory, each decoy is copied to save_path/[name]/Input.pdb with save_input
+    :param save_input: keep the inputs of each decoy in its own directory
+    :return:
+    list of decoy names, list of docking model paths
+    """
+    listfiles=[x for x in os.listdir(input_path) if ".pdb" in x]
+    listfiles.sort()
+    Study_Name=[]
+    Structure_List=[]
+    for item in listfiles:
+        input_pdb_path=os.path.join(input_path,item)
+        Study_Name.append(item[:-4])
+        structure_path=input_pdb_path
+        if save_input:
+            cur_root_path = os.path.join(save_path, item[:-4])
+            mkdir(cur_root_path)
+            structure_path=os.path.join(cur_root_path,"Input.pdb")
+            shutil.copy(input_pdb_path, structure_path)
+        Structure_List.append(structure_path)
+    return Study_Name,Structure_List
 
 def predict_multi_input(input_path, params):
     save_path = os.path.join(os.getcwd(), "Predict_Result")
@@ -54,62 +299,87 @@ def predict_multi_input(input_path, params):
     save_path = os.path.join(save_path, "Fold_" + str(params['fold']) + "_Result")
     mkdir(save_path)
     input_path=os.path.abspath(input_path)
-    folder_name=os.path.split(input_path)[1]
+    multi_model=os.path.isfile(input_path)
+    docking_out=multi_model and input_path.endswith(".out")
+    if docking_out:
+        folder_name=os.path.split(input_path)[1][:-4]
+    else:
+        folder_name=PDB_Stem(input_path) if multi_model else os.path.split(input_path)[1]
     save_path = os.path.join(save_path, folder_name)
     mkdir(save_path)
 
-    fold_choice = params['fold']
-    # loading the model
-    if fold_choice != -1:
-        model_path = os.path.join(os.getcwd(), "best_model")
-        model_path = os.path.join(model_path, "fold" + str(fold_choice))
-        model_path = os.path.join(model_path, "checkpoint.pth.tar")
-        model, device = init_model(model_path, params)
-    else:
-        root_model_path = os.path.join(os.getcwd(), "best_model")
-        model_list = []
-        for k in range(1, 4):
-            model_path = os.path.join(root_model_path, "fold" + str(k))
-            model_path = os.path.join(model_path, "checkpoint.pth.tar")
-            model, device = init_model(model_path, params)
-            model_list.append(model)
-        model = model_list
-
-    listfiles=[x for x in os.listdir(input_path) if ".pdb" in x]
-    listfiles.sort()
-    Study_Name=[]
-    Input_File_List=[]
-    for item in listfiles:
-        input_pdb_path=os.path.join(input_path,item)
-        cur_root_path = os.path.join(save_path, item[:-4])
-        Study_Name.append(item[:-4])
-        mkdir(cur_root_path)
-        structure_path=os.path.join(cur_root_path,"Input.pdb")
-        shutil.copy(input_pdb_path, structure_path)
-        input_file = Prepare_Input(structure_path)
-        Input_File_List.append(input_file)
-    list_npz = Input_File_List
-    dataset = Single_Dataset(list_npz)
-    dataloader = DataLoader(dataset, params['batch_size'], shuffle=False,
-                            num_workers=params['num_workers'],
-                            drop_last=False, collate_fn=collate_fn)
-
-    # prediction
-    if fold_choice != -1:
-        Final_Pred = Get_Predictions(dataloader, device, model)
+    if params['profile']:
+        # stage timings of this process and of the workers it spawns
+        Start_Profile(os.path.join(save_path,"Profile"))
+    # options are checked before the journal is opened, a new journal replaces the one of an earlier run
+    Output_Formats(params['output_format'])
+    if params['cpu_workers']>1 and params['feature_store']:
+        raise ValueError("--feature_store is written by a single process, it is not supported with --cpu_workers")
+    if multi_model and params['save_input']:
+        raise ValueError("--save_input needs one pdb file per decoy, it is not supported for a multi-model pdb or a MEGADOCK .out")
+    if docking_out:
+        # poses are applied to the ligand in memory instead of writing decoygen pdbs
+        Study_Name=Pose_Names(input_path,params['num_poses'])
+        Structures=lambda:Named_Structures(Study_Name,Read_Poses(input_path,params['receptor'],params['ligand'],params['num_poses']))
+    elif multi_model:
+        # models of one (gzipped) multi-model pdb are streamed from it instead of being split into files
+        Study_Name=Model_Names(input_path)
+        Structures=lambda:Named_Structures(Study_Name,Read_Models(input_path))
     else:
-        Final_Pred = []
-        for cur_model in model:
-            tmp_pred = Get_Predictions(dataloader, device, cur_model)
-            Final_Pred.append(tmp_pred)
-        Final_Pred = np.mean(Final_Pred, axis=0)
+        Study_Name,Structure_List=Decoy_Files(input_path,save_path,params['save_input'])
+        Structures=partial(iter,Structure_List)
+
+    # only the first decoy of each group of duplicates is scored, the others copy its score
+    Representative={name:name for name in Study_Name}
+    if params['dedup_grid']>0:
+        dedup_time=time.time()
+        Representative=Dedup_Decoys(Study_Name,Structures(),params['dedup_grid'])
+        dedup_time=time.time()-dedup_time
+    # decoys scored by an interrupted run are kept in the journal and skipped with --resume=1
+    # live ranking of the best decoys so far, duplicates are ranked with the score of their representative
+    ranking=None
+    if params['top_k']>0:
+        groups={}
+        for name in Study_Name:
+            groups.setdefault(Representative[name],[]).append(name)
+        ranking=Top_K_Ranking(os.path.join(save_path,"Predict_top.txt"),params['top_k'],groups)
+    journal=Score_Journal(os.path.join(save_path,"Predict_journal.txt"),params['resume'],ranking,Prefilter_Thresholds(params))
+    Scored_Name=set(journal.scores)
+    Score_Name=[name for name in Study_Name if Representative[name]==name]
+    Remain_Name=[name for name in Score_Name if name not in Scored_Name]
+    print("%d/%d decoys already scored in the journal"%(len(Score_Name)-len(Remain_Name),len(Score_Name)))
+    Remain_Structure=(structure for name,structure in zip(Study_Name,Structures())
+                      if Representative[name]==name and name not in Scored_Name)
+    filter_count=[0]*len(FILTER_STAGES)
+    predict_time=time.time()
+    if params['cpu_workers']>1:
+        # shards of decoys are prepared and scored by worker processes, each with its own model
+        CPU_Predict(Remain_Name,Remain_Structure,params,journal,filter_count)
+    elif len(Remain_Name)>0:
+        Stream_Predict(Remain_Name,Remain_Structure,params,journal,filter_count)
+    journal.Close()
+    predict_time=time.time()-predict_time
+    Final_Pred=[journal.scores[Representative[name]] for name in Study_Name]
+    Fold_Pred=[journal.folds.get(Representative[name]) for name in Study_Name]
+    if params['dedup_grid']>0:
+        # time per decoy between batch windows, or an upper bound including startup with a single window
+        decoy_time=journal.Decoy_Time(max(params['cpu_workers'],1))
+        Write_Dedup_Report(os.path.join(save_path,"Dedup_report.txt"),Study_Name,Representative,dedup_time,
+                           predict_time/max(len(Remain_Name),1) if decoy_time is None else decoy_time,decoy_time is None)
+    # decoys without interface are dropped and reported even without pre-filter thresholds
+    if Prefilter_Thresholds(params) is not None or filter_count[-1]>0:
+        Write_Filter_Report(os.path.join(save_path,"Prefilter_report.txt"),filter_count,len(Remain_Name),
+                            sum(1 for score in Final_Pred if score==FILTERED_SCORE))
     pred_path = os.path.join(save_path, 'Predict.txt')
     with open(pred_path, 'w') as file:
         file.write("Input\tScore\n")
-        for k in range(len(Input_File_List)):
+        for k in range(len(Final_Pred)):
             file.write(Study_Name[k] + "\t%.4f\n" % Final_Pred[k])
-    pred_sort_path=os.path.join(save_path,"Predict_sort.txt")
-    os.system("sort -n -k 2 -r "+pred_path+" >"+pred_sort_path)
+    # ranked in process, the header stays on top and ties keep the input order
+    Fold_Names=["Fold_%d"%fold for fold in ([1,2,3] if params['fold']==-1 else [params['fold']])]
+    Write_Ranked_Output(save_path,Study_Name,Final_Pred,Fold_Pred,Fold_Names,params['output_format'])
+    if params['profile']:
+        Write_Profile_Report()
 
 
 
@@ -34,33 +34,87 @@
 import os
 from ops.os_operation import mkdir
 import shutil
-import  numpy as np
-from data_processing.Prepare_Input import Prepare_Input
+from data_processing.Prepare_Input import Prepare_Sample,Sample_Stage,FILTERED_SCORE
+from data_processing.Feature_Cache import Feature_Cache
 from model.GNN_Model import GNN_Model
+from model.Ensemble_Model import Ensemble_Model
+from model.Script_Model import Script_Model
+from model.Quantize_Model import Quantize_Model
 import torch
 from ops.train_utils import count_parameters,initialize_model
-from data_processing.collate_fn import collate_fn
+from data_processing.collate_fn import collate_fn,sparse_collate_fn
 from data_processing.Single_Dataset import Single_Dataset
 from torch.utils.data import DataLoader
+from ops.Stage_Profiler import Profile_Stage,Start_Profile,Write_Profile_Report
 
 def init_model(model_path,params):
     model = GNN_Model(params)
     print('    Total params: %.10fM' % (count_parameters(model) / 1000000.0))
     device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
     model = initialize_model(model, device)
-    state_dict = torch.load(model_path)
+    state_dict = torch.load(model_path, map_location=device)
     model.load_state_dict(state_dict['state_dict'])
     model.eval()
     return model,device
-def Get_Predictions(dataloader,device,model):
+
+def Script_Path(params):
+    """
+    :return: path of the TorchScript artifact of params['fold'], written by mode 4
+    """
+    if params['engine_path']:
+        return os.path.abspath(params['engine_path'])
+    return os.path.join(os.getcwd(), "best_model", "script_fold" + str(params['fold']) + ".pt")
+
+def Load_Model(params):
+    """
+    load the model of params['fold'], or an Ensemble_Model of fold 1-3 models if fold is -1
+    :return:
+    model, device
+    """
+    fold_choice = params['fold']
+    if params['engine'] == 'torchscript':
+        #the exported artifact is traced on cpu
+        device = torch.device("cpu")
+        return Script_Model(Script_Path(params), device), device
+    root_model_path = os.path.join(os.getcwd(), "best_model")
+    if fold_choice != -1:
+        model_path = os.path.join(root_model_path, "fold" + str(fold_choice))
+        model_path = os.path.join(model_path, "checkpoint.pth.tar")
+        model, device = init_model(model_path, params)
+    else:
+        model_list = []
+        for k in range(1, 4):
+            model_path = os.path.join(root_model_path, "fold" + str(k))
+            model_path = os.path.join(model_path, "checkpoint.pth.tar")
+            model, device = init_model(model_path, params)
+            model_list.append(model)
+        model = Ensemble_Model(model_list)
+    if params['quantize']:
+        #dynamic quantized kernels only run on cpu
+        device = torch.device("cpu")
+        model = Quantize_Model(model.to(device))
+    return model, device
+def Get_Predictions(dataloader,device,model,fold_pred=None):
+    """
+    :param fold_pred: list extended in place with the score of each fold model per input, None to skip
+    :return: list of scores
+    """
     Final_pred = []
     with torch.no_grad():
         for batch_idx, sample in enumerate(dataloader):
             H, A1, A2, V, Atom_count = sample
             batch_size = H.size(0)
-            H, A1, A2, V = H.to(device), A1.to(device), A2.to(device), V.to(device)
-            pred= model.test_model((H, A1, A2, V, Atom_count), device)
-            pred1 = pred.detach().cpu().numpy()
+            with Profile_Stage("forward","batch of %d"%batch_size):
+                H, A1, A2, V = H.to(device), A1.to(device), A2.to(device), V.to(device)
+                if fold_pred is not None and hasattr(model, 'test_model_folds'):
+                    folds = model.test_model_folds((H, A1, A2, V, Atom_count), device)
+                    pred = folds.mean(1)
+                    fold_pred += [list(row) for row in folds.detach().cpu().numpy()]
+                else:
+                    pred= model.test_model((H, A1, A2, V, Atom_count), device)
+                    if fold_pred is not None:
+                        fold_pred += [[score] for score in pred.detach().cpu().numpy()]
+                pred1 = pred.detach().cpu().numpy()
             Final_pred += list(pred1)
     return Final_pred
 
@@ -80,47 +134,39 @@ def predict_single_input(input_path,params):
     save_path=os.path.join(save_path,split_name)
     mkdir(save_path)
 
-    structure_path=os.path.join(save_path,"Input.pdb")
-    shutil.copy(input_path,structure_path)
-    input_file=Prepare_Input(structure_path)
-    fold_choice = params['fold']
-    #loading the model
-    if fold_choice != -1:
-        model_path = os.path.join(os.getcwd(), "best_model")
-        model_path = os.path.join(model_path, "fold" + str(fold_choice))
-        model_path=os.path.join(model_path,"checkpoint.pth.tar")
-        model,device=init_model(model_path,params)
+    if params['profile']:
+        Start_Profile(os.path.join(save_path,"Profile"))
+    structure_path=input_path
+    if params['save_input']:
+        structure_path=os.path.join(save_path,"Input.pdb")
+        shutil.copy(input_path,structure_path)
+    cache=Feature_Cache(params['cache_dir'],params['cache_size']) if params['cache_dir'] else None
+    sample=Prepare_Sample(structure_path,params['sparse'],cache,params['save_input'])
+    if cache is not None:
+        cache.Evict()
+    if Sample_Stage(sample)>=0:
+        #no receptor-ligand interface, an empty graph is not given to the model
+        print("No interface between the receptor and the ligand, scored %.4f"%FILTERED_SCORE)
+        Final_Pred=[FILTERED_SCORE]
     else:
-        root_model_path = os.path.join(os.getcwd(), "best_model")
-        model_list=[]
-        for k in range(1,4):
-            model_path = os.path.join(root_model_path, "fold" + str(k))
-            model_path = os.path.join(model_path,"checkpoint.pth.tar")
-            model,device = init_model(model_path, params)
-            model_list.append(model)
-        model=model_list
+        #loading the model
+        model,device=Load_Model(params)
 
-    #loading data for predicition
-    list_npz = [input_file]
-    dataset = Single_Dataset(list_npz)
-    dataloader = DataLoader(dataset, 1, shuffle=False,
-                            num_workers=params['num_workers'],
-                            drop_last=False, collate_fn=collate_fn)
+        #loading data for predicition
+        dataset = Single_Dataset([sample])
+        dataloader = DataLoader(dataset, 1, shuffle=False,
+                                num_workers=params['num_workers'],
+                                drop_last=False, collate_fn=sparse_collate_fn if params['sparse'] else collate_fn)
 
-    #prediction
-    if fold_choice!=-1:
+        #prediction, all the fold models run on the same batch
         Final_Pred=Get_Predictions(dataloader, device, model)
-    else:
-        Final_Pred=[]
-        for cur_model in model:
-            tmp_pred=Get_Predictions(dataloader, device, cur_model)
-            Final_Pred.append(tmp_pred)
-        Final_Pred=np.mean(Final_Pred,axis=0)
     #write the predictions
     pred_path=os.path.join(save_path,'Predict.txt')
     with open(pred_path,'w') as file:
         file.write("Input\tScore\n")
         file.write(original_pdb_name+"\t%.4f\n"%Final_Pred[0])
+    if params['profile']:
+        Write_Profile_Report()
 
 
 
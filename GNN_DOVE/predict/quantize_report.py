@@ -0,0 +1,117 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import time
+import numpy as np
+import torch
+from scipy.stats import spearmanr
+from ops.os_operation import mkdir
+from data_processing.Feature_Cache import Feature_Cache
+from data_processing.collate_fn import collate_fn,sparse_collate_fn
+from model.Quantize_Model import Quantize_Model
+from predict.predict_single_input import Load_Model
+from predict.predict_multi_input import Predict_Window,Store_Input_Stream
+
+def quantize_report(input_path,params,top_k=10):
+    """
+    score a reference decoy set with the fp32 checkpoint and with --quantize, and report the score drift
+    :param input_path: directory of reference docking models
+    :param params: model parameters, fold is used
+    :param top_k: size of the top ranked set compared between the two models
+    :return:
+    """
+    save_path = os.path.join(os.getcwd(), "Predict_Result")
+    mkdir(save_path)
+    save_path = os.path.join(save_path, "Quantize_Report")
+    mkdir(save_path)
+    save_path = os.path.join(save_path, "Fold_" + str(params['fold']) + "_Result")
+    mkdir(save_path)
+    input_path=os.path.abspath(input_path)
+    save_path = os.path.join(save_path, os.path.split(input_path)[1])
+    mkdir(save_path)
+
+    params=dict(params,engine='eager',quantize=0,save_input=0)
+    model,device=Load_Model(params)
+    quantized_model=Quantize_Model(model.to(torch.device("cpu")))
+    model=model.to(device)
+
+    listfiles=[x for x in os.listdir(input_path) if ".pdb" in x]
+    listfiles.sort()
+    Study_Name=[item[:-4] for item in listfiles]
+    Structure_List=[os.path.join(input_path,item) for item in listfiles]
+    cache=Feature_Cache(params['cache_dir'],params['cache_size']) if params['cache_dir'] else None
+    collate=sparse_collate_fn if params['sparse'] else collate_fn
+    window_size=max(params['bucket_window'],params['batch_size'])
+    Full_Pred=[]
+    Quantized_Pred=[]
+    full_time=0
+    quantized_time=0
+    window_list=[]
+    for k,sample in enumerate(Store_Input_Stream(Study_Name,Structure_List,None,cache,params)):
+        window_list.append(sample)
+        if len(window_list)<window_size and k<len(Study_Name)-1:
+            continue
+        start=time.time()
+        Full_Pred+=Predict_Window(window_list,device,model,collate,params)
+        full_time+=time.time()-start
+        start=time.time()
+        Quantized_Pred+=Predict_Window(window_list,torch.device("cpu"),quantized_model,collate,params)
+        quantized_time+=time.time()-start
+        window_list=[]
+    if cache is not None:
+        cache.Evict()
+
+    Full_Pred=np.array(Full_Pred)
+    Quantized_Pred=np.array(Quantized_Pred)
+    drift=np.abs(Quantized_Pred-Full_Pred)
+    top_k=min(top_k,len(Full_Pred))
+    top_overlap=len(set(np.argsort(-Full_Pred)[:top_k])&set(np.argsort(-Quantized_Pred)[:top_k]))
+    correlation=spearmanr(Full_Pred,Quantized_Pred)[0] if len(Full_Pred)>1 else float('nan')
+    summary=["Decoys\t%d"%len(Full_Pred),
+             "Max_Drift\t%.4f"%(drift.max() if len(drift) else 0),
+             "Mean_Drift\t%.4f"%(drift.mean() if len(drift) else 0),
+             "Spearman\t%.4f"%correlation,
+             "Top%d_Overlap\t%d"%(top_k,top_overlap),
+             "FP32_Time\t%.2f"%full_time,
+             "INT8_Time\t%.2f"%quantized_time]
+    report_path=os.path.join(save_path,"Quantize_Report.txt")
+    with open(report_path,'w') as file:
+        for line in summary:
+            file.write("#"+line+"\n")
+        file.write("Input\tFP32\tINT8\tDrift\n")
+        for k in range(len(Full_Pred)):
+            file.write(Study_Name[k]+"\t%.4f\t%.4f\t%.4f\n"%(Full_Pred[k],Quantized_Pred[k],drift[k]))
+    print("\n".join(summary))
+    print("Quantization report saved to %s"%report_path)
@@ -0,0 +1,149 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import csv
+import json
+import heapq
+
+class Top_K_Ranking(object):
+    """
+    bounded heap of the best scored decoys, rewritten to a file whenever new scores arrive,
+    so that downstream stages can start on the best decoys before scoring finishes
+    """
+    def __init__(self,top_path,top_k,groups=None):
+        """
+        :param top_path: path of the live ranking file
+        :param top_k: number of decoys kept in the ranking
+        :param groups: dict of scored decoy name to the decoys sharing its score (duplicates), None if each decoy is scored
+        """
+        self.top_path=top_path
+        self.top_k=top_k
+        self.groups=groups or {}
+        self.heap=[]
+        self.count=0
+        #decoys already ranked, so that per-batch and per-window updates of the same scores are not counted twice
+        self.ranked=set()
+
+    def Update(self,name_list,score_list):
+        """
+        add scored decoys and rewrite the ranking file, decoys ranked before are skipped
+        """
+        for name,score in zip(name_list,score_list):
+            if name in self.ranked:
+                continue
+            self.ranked.add(name)
+            for member in self.groups.get(name,[name]):
+                #earlier decoys win ties, as in the final ranking
+                item=(float(score),-self.count,member)
+                self.count+=1
+                if len(self.heap)<self.top_k:
+                    heapq.heappush(self.heap,item)
+                elif item>self.heap[0]:
+                    heapq.heapreplace(self.heap,item)
+        self.Write()
+
+    def Write(self):
+        #write a temporary file and rename it, readers never see a partial ranking
+        tmp_path=self.top_path+".tmp"
+        with open(tmp_path,'w') as file:
+            file.write("Rank\tInput\tScore\n")
+            for rank,(score,_,name) in enumerate(sorted(self.heap,reverse=True)):
+                file.write("%d\t%s\t%.4f\n"%(rank+1,name,score))
+        os.replace(tmp_path,self.top_path)
+
+def Rank_Order(score_list):
+    """
+    :return: indices of score_list from the best to the worst score, ties in input order
+    """
+    return sorted(range(len(score_list)),key=lambda k:-score_list[k])
+
+def Ranked_Rows(Study_Name,Final_Pred,Fold_Pred=None,fold_names=()):
+    """
+    :param Study_Name: decoy names
+    :param Final_Pred: scores, same order as Study_Name
+    :param Fold_Pred: score of each fold model per decoy, None for the decoys without fold scores
+    :param fold_names: column names of the fold scores, used when a decoy has one score per fold
+    :return:
+    list of dicts of Rank, Input, Score and the fold columns, best score first
+    """
+    rows=[]
+    for rank,k in enumerate(Rank_Order(Final_Pred)):
+        row={'Rank':rank+1,'Input':Study_Name[k],'Score':float(Final_Pred[k])}
+        folds=Fold_Pred[k] if Fold_Pred is not None else None
+        for i,fold_name in enumerate(fold_names):
+            row[fold_name]=float(folds[i]) if folds is not None and len(folds)==len(fold_names) else None
+        rows.append(row)
+    return rows
+
+def Output_Formats(output_format):
+    """
+    :param output_format: comma separated list of csv, json and parquet
+    :return: list of the formats, checked before scoring so that a long run does not fail at the end
+    """
+    formats=[x.strip() for x in output_format.split(",") if x.strip()]
+    for item in formats:
+        if item not in ('csv','json','parquet'):
+            raise ValueError("unknown output format %s, expected csv, json or parquet"%item)
+    if 'parquet' in formats:
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError("--output_format=parquet needs pandas and pyarrow")
+    return formats
+
+def Write_Ranked_Output(save_path,Study_Name,Final_Pred,Fold_Pred=None,fold_names=(),output_format=''):
+    """
+    write Predict_sort.txt, and Predict.csv/Predict.json/Predict.parquet with the fold scores
+    :param save_path: result directory
+    :param output_format: comma separated list of csv, json and parquet, empty for Predict_sort.txt only
+    """
+    rows=Ranked_Rows(Study_Name,Final_Pred,Fold_Pred,fold_names)
+    with open(os.path.join(save_path,"Predict_sort.txt"),'w') as file:
+        file.write("Input\tScore\n")
+        for row in rows:
+            file.write("%s\t%.4f\n"%(row['Input'],row['Score']))
+    columns=['Rank','Input','Score']+list(fold_names)
+    for item in Output_Formats(output_format):
+        if item=='csv':
+            with open(os.path.join(save_path,"Predict.csv"),'w',newline='') as file:
+                writer=csv.DictWriter(file,fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+        elif item=='json':
+            with open(os.path.join(save_path,"Predict.json"),'w') as file:
+                json.dump(rows,file,indent=1)
+        elif item=='parquet':
+            import pandas as pd
+            pd.DataFrame(rows,columns=columns).to_parquet(os.path.join(save_path,"Predict.parquet"),index=False)
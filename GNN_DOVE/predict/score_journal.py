@@ -0,0 +1,137 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+
+import os
+import time
+from data_processing.Prepare_Input import FILTERED_SCORE
+
+#header line of the pre-filter thresholds the following decoys were dropped with
+PREFILTER_HEADER="#prefilter"
+
+class Score_Journal(object):
+    """
+    append-only journal of scored decoys, written as soon as each batch window is scored,
+    so that an interrupted run can be resumed without scoring the finished decoys again
+    """
+    def __init__(self,journal_path,resume=False,ranking=None,prefilter=None):
+        """
+        :param journal_path: path of the journal file
+        :param resume: keep the scores of an existing journal, otherwise start a new one
+        :param ranking: Top_K_Ranking updated with every recorded score, None to disable
+        :param prefilter: thresholds from Prefilter_Thresholds of this run, decoys dropped with other thresholds are scored again
+        """
+        self.journal_path=journal_path
+        self.ranking=ranking
+        self.prefilter=repr(prefilter)
+        self.header=None
+        self.scores={}
+        self.folds={}
+        #time and number of decoys of every record, to time the decoys without the startup costs
+        self.records=[]
+        if resume and os.path.exists(journal_path):
+            with open(journal_path,'rb+') as file:
+                #drop a line cut by a crash, it is scored again
+                file.truncate(file.read().rfind(b"\n")+1)
+            self.scores,self.folds,headers=self.Load()
+            #dropped with other thresholds (or by a journal without header), dropped again or scored with these ones
+            stale=[name for name,score in self.scores.items() if score==FILTERED_SCORE and headers[name]!=self.prefilter]
+            for name in stale:
+                del self.scores[name]
+                self.folds.pop(name,None)
+            if len(stale)>0:
+                print("%d decoys dropped with other pre-filter thresholds are checked again"%len(stale))
+            if ranking is not None and len(self.scores)>0:
+                ranking.Update(list(self.scores),list(self.scores.values()))
+        self.file=open(journal_path,'a' if resume else 'w')
+        if self.header!=self.prefilter:
+            self.file.write("%s\t%s\n"%(PREFILTER_HEADER,self.prefilter))
+            self.header=self.prefilter
+
+    def Load(self):
+        """
+        :return: dict of decoy name to score of the complete journal lines, dict of decoy name to fold scores of the lines that have them,
+        dict of decoy name to the pre-filter header in effect when it was recorded, and sets self.header to the last header
+        """
+        scores={}
+        folds={}
+        headers={}
+        if not os.path.exists(self.journal_path):
+            return scores,folds,headers
+        with open(self.journal_path,'r') as file:
+            for line in file:
+                item=line.rstrip("\n").split("\t")
+                if item[0]==PREFILTER_HEADER and len(item)==2:
+                    self.header=item[1]
+                    continue
+                if len(item)<2:
+                    continue
+                try:
+                    scores[item[0]]=float(item[1])
+                    headers[item[0]]=self.header
+                    if len(item)>2:
+                        folds[item[0]]=[float(x) for x in item[2:]]
+                except ValueError:
+                    continue
+        return scores,folds,headers
+
+    def Record(self,name_list,score_list,fold_list=None):
+        """
+        append scored decoys and make sure they reach the disk
+        :param fold_list: fold scores of each decoy, appended as extra columns, None to skip
+        """
+        for k,(name,score) in enumerate(zip(name_list,score_list)):
+            folds=fold_list[k] if fold_list is not None else None
+            line="%s\t%r"%(name,float(score))
+            if folds is not None:
+                line+="".join("\t%r"%float(x) for x in folds)
+                self.folds[name]=[float(x) for x in folds]
+            self.file.write(line+"\n")
+            self.scores[name]=float(score)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.records.append((time.time(),len(name_list)))
+        if self.ranking is not None:
+            self.ranking.Update(name_list,score_list)
+
+    def Decoy_Time(self,skip=1):
+        """
+        :param skip: records of the first round, which include process startup and model loading, one per worker
+        :return: seconds per decoy recorded after the first skip records, None without records after them
+        """
+        if len(self.records)<=skip:
+            return None
+        return (self.records[-1][0]-self.records[skip-1][0])/sum(count for _,count in self.records[skip:])
+
+    def Close(self):
+        self.file.close()
@@ -0,0 +1,280 @@
+# Publication:  "Protein Docking Model Evaluation by Graph Neural Networks", Xiao Wang, Sean T Flannery and Daisuke Kihara,  (2020)
+
+#GNN-Dove is a computational tool using graph neural network that can evaluate the quality of docking protein-complexes.
+
+#Copyright (C) 2020 Xiao Wang, Sean T Flannery, Daisuke Kihara, and Purdue University.
+
+#License: GPL v3 for academic use. (For commercial use, please contact us for different licensing.)
+
+#Contact: Daisuke Kihara (dkihara@purdue.edu)
+
+#
+
+# This program is free software: you can redistribute it and/or modify
+
+# it under the terms of the GNU General Public License as published by
+
+# the Free Software Foundation, version 3.
+
+#
+
+# This program is distributed in the hope that it will be useful,
+
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+
+# GNU General Public License V3 for more details.
+
+#
+
+# You should have received a copy of the GNU v3.0 General Public License
+
+# along with this program.  If not, see https://www.gnu.org/licenses/gpl-3.0.en.html.
+import os
+import json
+import queue
+import threading
+import time
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+import numpy as np
+import torch
+from ops.os_operation import mkdir
+from data_processing.Prepare_Input import Prepare_Sample,Sample_Stage,FILTERED_SCORE
+from data_processing.Feature_Cache import Feature_Cache
+from data_processing.collate_fn import collate_fn,sparse_collate_fn
+from data_processing.Size_Batch_Sampler import Batch_Budget
+from predict.predict_single_input import Load_Model
+from predict.predict_multi_input import Is_Out_Of_Memory
+
+
+class Batch_Scorer(object):
+    """
+    collects scoring jobs from concurrent requests and runs them through the model in dynamic batches
+    """
+    def __init__(self,model,device,collate,batch_size,batch_wait,max_atoms2=0):
+        """
+        :param model: loaded model or Ensemble_Model
+        :param device: model device
+        :param collate: collate function matching the prepared input format
+        :param batch_size: maximum number of inputs in one batch, 0 to batch by max_atoms2 only
+        :param batch_wait: seconds to wait for more jobs after the first job of a batch arrives
+        :param max_atoms2: budget of len(batch)*max_natoms^2 for one batch, as in Size_Batch_Sampler, 0 for no budget
+        """
+        self.model=model
+        self.device=device
+        self.collate=collate
+        self.batch_size=batch_size
+        self.batch_wait=batch_wait
+        self.max_atoms2=max_atoms2
+        self.jobs=queue.Queue()
+        worker=threading.Thread(target=self.Run,daemon=True)
+        worker.start()
+
+    def Score(self,sample,attention=False):
+        """
+        :param sample: loaded input of one decoy
+        :param attention: also return per-atom attention
+        :return: dict with score, and attention1/attention2 if requested
+        """
+        return self.Result(self.Submit(sample,attention))
+
+    def Submit(self,sample,attention=False):
+        """
+        queue one decoy without waiting, so that the decoys of one request can share batches
+        :return: job to pass to Result
+        """
+        job={'sample':sample,'attention':attention,'done':threading.Event()}
+        self.jobs.put(job)
+        return job
+
+    def Result(self,job):
+        """
+        :return: dict with score, and attention1/attention2 if requested, once the job is scored
+        """
+        job['done'].wait()
+        if 'error' in job:
+            raise job['error']
+        return job['result']
+
+    def Run(self):
+        next_job=None
+        while True:
+            job_list=[next_job if next_job is not None else self.jobs.get()]
+            next_job=None
+            max_natoms=len(job_list[0]['sample']['V'])
+            deadline=time.time()+self.batch_wait
+            while self.batch_size<=0 or len(job_list)<self.batch_size:
+                timeout=deadline-time.time()
+                if timeout<=0:
+                    break
+                try:
+                    job=self.jobs.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                natoms=max(max_natoms,len(job['sample']['V']))
+                if self.max_atoms2>0 and (len(job_list)+1)*natoms**2>self.max_atoms2:
+                    #over the budget, the job starts the next batch
+                    next_job=job
+                    break
+                job_list.append(job)
+                max_natoms=natoms
+            try:
+                self.Predict_Split(job_list)
+            except Exception as e:
+                for job in job_list:
+                    job['error']=e
+            for job in job_list:
+                job['done'].set()
+
+    def Predict_Split(self,job_list):
+        """
+        same as Predict, but splits the jobs in halves while the batch runs out of memory
+        """
+        try:
+            self.Predict(job_list)
+            return
+        except (RuntimeError, MemoryError) as e:
+            if len(job_list)==1 or not Is_Out_Of_Memory(e):
+                raise
+        if self.device.type=="cuda":
+            torch.cuda.empty_cache()
+        half=len(job_list)//2
+        self.Predict_Split(job_list[:half])
+        self.Predict_Split(job_list[half:])
+
+    def Predict(self,job_list):
+        H, A1, A2, V, Atom_count = self.collate([job['sample'] for job in job_list])
+        H, A1, A2, V = H.to(self.device), A1.to(self.device), A2.to(self.device), V.to(self.device)
+        data=(H, A1, A2, V, Atom_count)
+        with torch.no_grad():
+            pred=self.model.test_model(data,self.device).detach().cpu().numpy()
+            if any(job['attention'] for job in job_list):
+                atten1,atten2=self.model.eval_model_attention(data,self.device)
+                atten1=Attention_Per_Atom(atten1,Atom_count)
+                atten2=Attention_Per_Atom(atten2,Atom_count)
+        for k,job in enumerate(job_list):
+            job['result']={'score':float(pred[k])}
+            if job['attention']:
+                job['result']['attention1']=atten1[k].tolist()
+                job['result']['attention2']=atten2[k].tolist()
+
+def Attention_Per_Atom(attention,atom_list):
+    """
+    sum attention of each atom like visualize_attention, per input of the batch
+    :param attention: dense batch_size*max_atoms*max_atoms attention, or sparse attention of concatenated graphs
+    :param atom_list: number of atoms of each input
+    :return:
+    list of per-atom attention arrays
+    """
+    atom_list=[int(num_atoms) for num_atoms in atom_list]
+    if attention.is_sparse:
+        attention=torch.sparse.sum(attention,dim=1).to_dense().cpu().numpy()
+        return np.split(attention,np.cumsum(atom_list)[:-1])
+    attention=attention.cpu().numpy()
+    return [np.sum(attention[k,:num_atoms,:num_atoms],axis=1) for k,num_atoms in enumerate(atom_list)]
+
+class Score_Handler(BaseHTTPRequestHandler):
+    """
+    POST /score {"pdb": [pdb paths on this machine], "attention": false}
+    returns {"results": [{"input": path, "score": float, "attention1": [...], "attention2": [...]}]}
+    decoys without receptor-ligand interface get score -1 and "error": "empty interface"
+    GET /health returns {"status": "ok"}
+    """
+    def do_GET(self):
+        if self.path!='/health':
+            self.Reply(404,{'error':'unknown path %s'%self.path})
+            return
+        self.Reply(200,{'status':'ok'})
+
+    def do_POST(self):
+        if self.path!='/score':
+            self.Reply(404,{'error':'unknown path %s'%self.path})
+            return
+        try:
+            length=int(self.headers.get('Content-Length',0))
+            request=json.loads(self.rfile.read(length).decode())
+            pdb_list=request['pdb']
+            if isinstance(pdb_list,str):
+                pdb_list=[pdb_list]
+            attention=bool(request.get('attention',False))
+        except (ValueError,KeyError) as e:
+            self.Reply(400,{'error':'bad request: %s'%e})
+            return
+        try:
+            results=self.server.Score_List(pdb_list,attention)
+        except Exception as e:
+            self.Reply(500,{'error':repr(e)})
+            return
+        self.Reply(200,{'results':results})
+
+    def Reply(self,code,content):
+        body=json.dumps(content).encode()
+        self.send_response(code)
+        self.send_header('Content-Type','application/json')
+        self.send_header('Content-Length',str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class Score_Server(ThreadingHTTPServer):
+    daemon_threads=True
+
+    def __init__(self,address,work_path,executor,scorer,params):
+        ThreadingHTTPServer.__init__(self,address,Score_Handler)
+        self.work_path=work_path
+        self.executor=executor
+        self.scorer=scorer
+        self.sparse=params['sparse']
+        self.save_input=params['save_input']
+        self.cache=Feature_Cache(params['cache_dir'],params['cache_size']) if params['cache_dir'] else None
+
+    def Score_List(self,pdb_list,attention):
+        # prepare on the process pool, Form_interface uses SIGALRM which only works in a main thread
+        future_list=[]
+        for pdb_path in pdb_list:
+            structure_path=os.path.abspath(pdb_path)
+            if self.save_input:
+                cur_root_path=tempfile.mkdtemp(dir=self.work_path)
+                shutil.copy(structure_path,os.path.join(cur_root_path,"Input.pdb"))
+                structure_path=os.path.join(cur_root_path,"Input.pdb")
+            future_list.append(self.executor.submit(Prepare_Sample,structure_path,self.sparse,self.cache,self.save_input))
+        # queue every decoy as soon as it is prepared and only then wait, so that one request fills batches
+        job_list=[]
+        for future in future_list:
+            sample=future.result()
+            #decoys without interface are not given to the model
+            job_list.append(self.scorer.Submit(sample,attention) if Sample_Stage(sample)<0 else None)
+        results=[]
+        for pdb_path,job in zip(pdb_list,job_list):
+            result=self.scorer.Result(job) if job is not None else {'score':FILTERED_SCORE,'error':'empty interface'}
+            result['input']=pdb_path
+            results.append(result)
+        return results
+
+def score_server(work_path,params):
+    """
+    keep the models loaded and score pdb files sent to http://host:port/score
+    :param work_path: directory to keep the prepared inputs if params['save_input'] is set
+    :param params: parameters, host/port/batch_size/batch_wait/prepare_workers and max_atoms2/memory_budget are used by the server
+    :return:
+    """
+    save_path=os.path.join(work_path,"Fold_"+str(params['fold'])+"_Result")
+    mkdir(work_path)
+    mkdir(save_path)
+    model, device = Load_Model(params)
+    collate=sparse_collate_fn if params['sparse'] else collate_fn
+    scorer=Batch_Scorer(model,device,collate,params['batch_size'],params['batch_wait']/1000.0,Batch_Budget(params))
+    executor=ProcessPoolExecutor(max_workers=max(params['prepare_workers'],1),mp_context=get_context("spawn"))
+    server=Score_Server((params['host'],params['port']),save_path,executor,scorer,params)
+    print("GNN-DOVE scoring server listening on http://%s:%d"%(params['host'],params['port']))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        executor.shutdown()
@@ -36,7 +36,7 @@ import os
 from ops.os_operation import mkdir
 import shutil
 import  numpy as np
-from data_processing.Prepare_Input import Prepare_Input
+from data_processing.Prepare_Input import Prepare_Input,Sample_Stage
 from model.GNN_Model import GNN_Model
 import torch
 from ops.train_utils import count_parameters,initialize_model
@@ -86,6 +86,9 @@ def visualize_attention(input_path,params):
     structure_path = os.path.join(save_path, "Input.pdb")
     shutil.copy(input_path, structure_path)
     input_file = Prepare_Input(structure_path)
+    with np.load(input_file) as data:
+        if Sample_Stage(data) >= 0:
+            raise ValueError("no receptor-ligand interface within 10A in %s, there is no attention to visualize" % input_path)
     list_npz = [input_file]
     dataset = Single_Dataset(list_npz)
     dataloader = DataLoader(dataset, 1, shuffle=False,